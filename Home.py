@@ -7,6 +7,8 @@ from app_functions import *
 
 st.set_page_config(page_title = "Home", layout="wide")
 
+SESSION_LENGTH = 30 #minutes
+
 #CONVERT FILE TO DF
 def convert_to_df(uploaded_file):
     #process file into df
@@ -17,19 +19,128 @@ def convert_to_df(uploaded_file):
         st.error(f"Unable to read the file. Error: {e}")
     return
 
-#KEYWORD FILTERING
-def filter_data(df, keywords): #keywords stored as a dic
-    dropped_indices = []
-    for index, row in df.iterrows():
-        for keyword in keywords.keys():
-            try:
-                if row.astype(str).str.contains(keyword, case=False).any(): #case-insensitive, column-insensitive
-                    dropped_indices.append(index)
-                    break
-            except Exception as e:
-                st.warning(f"Error filtering row {index}: {e}")
-                continue
-    return df.drop(dropped_indices) # drop once at end for efficiency
+#LOAD ONE UPLOADED FILE INTO A VISIT TABLE (in this process, reusing the session's domain cache)
+def load_uploaded_file(uploaded_file, digest, keywords):
+    #small uploads go straight into an in-memory SQLite db; larger ones to one shared read-only file per content
+    with get_upload_store().lease(uploaded_file, digest, st.session_state.upload_owner) as source:
+        #check it's a valid SQLite file
+        try:
+            with stage("check file"):
+                conn = connect_history_db(source)
+                conn.execute("SELECT 1 FROM sqlite_master")
+                conn.close()
+        except sqlite3.Error:
+            st.error("Invalid SQLite database file")
+            st.stop()
+        with stage("detect browser"):
+            browser = detect_browser(source)
+        st.session_state.browser = browser      #checkpoint: save browser type for later
+
+        if 'domain_cache' not in st.session_state: #url -> domain memo, kept for re-uploads in this session
+            st.session_state.domain_cache = DomainCache()
+
+        visits = pd.DataFrame()
+        if browser not in ("chrome", "safari", "firefox"):
+            print("Unknown browser history database")
+            st.error("Unknown browser history database.")
+        elif use_pushdown: #SQLite filters, converts and adds domains; dropped rows never reach pandas
+            with stage("load (in SQLite)") as s:
+                visits = load_history_pushdown(source, browser, keywords, st.session_state.domain_cache)
+                s.rows_out = len(visits)
+        else: #add domains and convert time (human-readable) chunk by chunk
+            with stage("load (streaming)") as s:
+                visits, _ = load_history_streaming(source, browser, keywords,
+                                                   cache=st.session_state.domain_cache, sessionize=False)
+                s.rows_out = len(visits)
+    return visits
+
+#LOAD SEVERAL UPLOADED FILES (e.g. one per Chrome profile) IN WORKER PROCESSES, MERGED WITH A 'profile' COLUMN
+def load_uploaded_files(uploaded_files, digests, keywords):
+    profiles = profile_names([f.name for f in uploaded_files])
+    with contextlib.ExitStack() as leases:
+        sources = [leases.enter_context(get_upload_store().lease(f, d, st.session_state.upload_owner))
+                   for f, d in zip(uploaded_files, digests)]
+        with stage("load files in parallel") as s:
+            results = ingest_history_files(sources, keywords, use_pushdown)
+            s.rows_out = sum(len(r[1]) for r, _ in results if r is not None)
+
+    browsers, frames, names = [], [], []
+    for profile, (result, error) in zip(profiles, results):
+        if error is not None:
+            st.error(f"{profile}: {error}")
+            continue
+        browser, visits, removed = result
+        for keyword, count in removed.items():
+            keywords[keyword] += count
+        browsers.append(browser)
+        frames.append(visits)
+        names.append(profile)
+    st.session_state.browser = ", ".join(sorted(set(browsers))) or "unknown"
+    if not frames:
+        return pd.DataFrame()
+    with stage("merge profiles") as s:
+        visits = merge_profiles(frames, names)
+        s.rows_out = len(visits)
+    return visits
+
+#RELOAD A PARQUET EXPORT FROM THE RAW DATA PAGE (returns visits + their sessions, already filtered and sessionized)
+def load_export(uploaded_file, keywords):
+    try:
+        with stage("read export") as s:
+            visits, sessions_at, meta = read_history_export(uploaded_file)
+            s.rows_out = len(visits)
+    except ValueError as e:
+        st.error(str(e))
+        return pd.DataFrame(), None
+    st.session_state.browser = meta.get("browser", "unknown")
+    if keywords or meta.get("session_length") != SESSION_LENGTH: #rows or session length change: sessionize again
+        visits = filter_data(visits, keywords).reset_index(drop=True)
+        sessions_at = None
+    return visits, sessions_at
+
+#LOAD AND SESSIONIZE AN UPLOAD OF ONE OR MORE FILES (returns a HistoryStore, or None if there's nothing to show)
+#[keywords] are only filtered here in pushdown mode; otherwise every visit is kept and HistoryView filters them
+def process_history_files(uploaded_files, digests, keywords):
+    if 'upload_owner' not in st.session_state: #this session's claim on the upload store's files
+        st.session_state.upload_owner = UploadOwner()
+    sessions_at = None  #only exports come with their sessions
+    is_export = [is_parquet_upload(f) for f in uploaded_files]
+    if len(uploaded_files) == 1 and is_export[0]:
+        visits, sessions_at = load_export(uploaded_files[0], keywords)
+    elif any(is_export):
+        st.error("Please upload an exported Parquet file on its own.")
+        return None
+    elif len(uploaded_files) == 1:
+        visits = load_uploaded_file(uploaded_files[0], digests[0], keywords)
+    else:
+        visits = load_uploaded_files(uploaded_files, digests, keywords)
+
+    if visits.empty:    #no data in the file, or nothing left after filtering
+        st.error("There is no browsing data in this file." if len(uploaded_files) == 1 else
+                 "There is no browsing data in these files.")
+        return None
+
+    with stage("build HistoryStore", rows_in=len(visits)) as s:
+        history = HistoryStore(visits, SESSION_LENGTH, sessions_at)     #record sessions > visits, everything dictionary-encoded
+        s.rows_out = history.n_sessions
+    if history.n_sessions == 0:
+        st.error("No browsing sessions could be created from your data")
+        st.stop()
+    return history
+
+#READ ONE LARGE HISTORY FILE ON A BACKGROUND THREAD (pages show partial results until it's done, see follow_ingest)
+def start_background_ingest(uploaded_file, digest, cache_key, profiler):
+    if 'upload_owner' not in st.session_state:
+        st.session_state.upload_owner = UploadOwner()
+    if 'ingest' in st.session_state:    #a previous upload still being read
+        st.session_state.ingest.cancel()
+    lease = get_upload_store().lease(uploaded_file, digest, st.session_state.upload_owner)
+    #the thread gets its own domain cache: the session's isn't locked, and a later upload may use it meanwhile
+    st.session_state.ingest = IngestJob(lease, cache_key, {}, SESSION_LENGTH, DomainCache(),
+                                        StageProfiler() if profiler is not None else None).start()
+    st.session_state.pop('ingest_version', None)
+    st.session_state.pop('history', None)   #the previous file's results aren't shown next to this one's
+    st.session_state.sql_removed = {}
 
 def render_chrome_instructions():
     #st.info("**NOTE:** Check that you have closed your browser before uploading your data.")
@@ -129,13 +240,13 @@ st.markdown("""
 
     To get started, read the instructions below for how to **upload your history file** and **filter out keywords**. (Most large browsers - Chrome, Safari, etc. - store your history on your local device in a SQLite file. You'll need to upload this local file to analyze your data.
 
-    Concerned about privacy? We don't keep any of your data (see "Privacy" for more information). 
+    Concerned about privacy? We only keep your data while your session is open (see "Privacy" for more information). 
     """)
 
 st.markdown("""
 #### Keyword Filtering
 We know browsing history is sensitive. Before uploading your data, you can list any number of keywords in this box to exclude. Any domain, search, or url which contains the keyword will be removed. 
-We will not save your keywords anywhere.
+Your keywords are only kept while your session is open, and never written to disk.
 """)
 
 st.info("**IMPORTANT:** Keywords must be comma-separated (including the ending). EX: chatgpt, gemini, claude,")
@@ -154,7 +265,7 @@ if 'keywords' not in st.session_state: #save keywords into dic for this session
     st.session_state.keywords = {}
 
 st.markdown("""
-**NOTE:** You can see the results of your filtering in the page titled "Raw Data Tables." To make changes, just edit the keywords and re-upload the file!
+**NOTE:** You can see the results of your filtering in the page titled "Raw Data Tables." To make changes, just edit and save the keywords: your uploaded file is filtered again right away, no need to re-upload it!
 """)
 
 if st.button("Save keywords"): #submit button auto-saves text box
@@ -171,7 +282,7 @@ with col2:
     instructions = {
         "Google Chrome": render_chrome_instructions,
         "Safari": render_safari_instructions,
-        #"Mozilla Firefox": render_firefox_instructions,
+        "Mozilla Firefox": render_firefox_instructions,
     }
     #default to chrome
     if "selected_instructions" not in st.session_state:
@@ -189,85 +300,119 @@ st.markdown("""Instructions for uploading your local file are below. To learn mo
 instructions[st.session_state.selected_instructions]()  #call the key that correspons to the selection
 
 st.markdown("""##### Upload your file below!""")
+st.caption("Using several Chrome profiles? Drop each profile's History file in at once: they are read in parallel and combined, with a profile column in the raw data.")
+
+use_pushdown = st.checkbox(
+    "Filter inside the database (uses less memory for large History files)",
+    value=False,
+    help="Keyword filtering, time conversion and domain extraction run in SQLite, so removed rows are never loaded.",
+)
+
+record_performance = st.checkbox(
+    "Time each processing step",
+    value=False,
+    help="Shows how long reading, filtering and sessionizing your file took under \"Performance\" below.",
+)
 
 #FILE PROCESSING
-uploaded_file = st.file_uploader(   #render the file uploader
+uploaded_files = st.file_uploader(   #render the file uploader (several files: one per browser profile)
     "placeholder label to avoid error",
     label_visibility="collapsed",
     type=None,
+    accept_multiple_files=True,
 )
-if uploaded_file is None:
+if not uploaded_files:
     st.warning("Please upload the file to proceed.")
 else:
-    if uploaded_file.size > 500_000_000:  # 500MB limit
+    if any(f.size > 500_000_000 for f in uploaded_files):  # 500MB limit per file
         st.error("File too large (>500MB)")
         st.stop()
+    profiler = StageProfiler() if record_performance else None
     try:  #PROCESS FILE INTO A DF
-        with st.spinner('Processing your browsing history... This may take a moment.'):
-            df = pd.DataFrame()
-            temp_path = save_uploaded_file_to_temp(uploaded_file)
-            #check it's a valid SQLite file
-            try:
-                conn = sqlite3.connect(temp_path)
-                conn.execute("SELECT 1")
-                conn.close()
-            except sqlite3.Error:
-                st.error("Invalid SQLite database file")
-                st.stop()
-            browser = detect_browser(temp_path)
-            st.session_state.browser = browser      #checkpoint: save browser type for later
-
-            if browser == "chrome":
-                #print("Chrome history")
-                df = load_chrome_history_db(temp_path)
-            elif browser == "safari":
-                #print("Safari history")
-                df = load_safari_history_db(temp_path)
-            #elif browser == "firefox":
-            #    print("Firefox")
-            else:
-                print("Unknown browser history database")
-                st.error("Unknown browser history database.")
-
-            if df.empty:
-                st.error("There is no browsing data in this file.")
-                #st.stop()
-            else:
-                df = filter_data(df, st.session_state.keywords) #filter out keywords
-
-                if df.empty:    #check for empty after filtering
-                    st.error("There is no browsing data in this file.")
-                    #st.stop()
+        with st.spinner('Processing your browsing history... This may take a moment.'), profile_stages(profiler):
+            #keywords only change the parsed data in pushdown mode; otherwise the unfiltered store is re-filtered below
+            sql_keywords = {k: 0 for k in st.session_state.keywords} if use_pushdown else {}
+            #reruns from other widgets keep this session's result without re-reading the file
+            upload_key = (tuple(f.file_id for f in uploaded_files), tuple(sorted(sql_keywords)), SESSION_LENGTH)
+            if st.session_state.get('upload_key') != upload_key:
+                cache = get_history_cache()     #shared by every session: same bytes + keywords -> same store
+                with stage("hash upload"):
+                    digests = [file_digest(f) for f in uploaded_files]
+                #several files: the profile names are part of the result, so they're part of the key
+                content = digests[0] if len(digests) == 1 else tuple(zip((f.name for f in uploaded_files), digests))
+                cache_key = history_cache_key(content, sql_keywords, SESSION_LENGTH)
+                if 'upload_owner' not in st.session_state: #this session's claim on shared files and cached histories
+                    st.session_state.upload_owner = UploadOwner()
+                cached = cache.get(cache_key, st.session_state.upload_owner)
+                if cached is not None:
+                    st.session_state.browser, store, sql_keywords = cached
+                elif len(uploaded_files) == 1 and not use_pushdown and uploaded_files[0].size >= BACKGROUND_MIN_BYTES \
+                        and not is_parquet_upload(uploaded_files[0]):
+                    #large file: read it on a background thread and show results as they come in
+                    start_background_ingest(uploaded_files[0], digests[0], cache_key, profiler)
+                    st.session_state.upload_key = upload_key
+                    store = None
                 else:
-                    st.session_state.uploaded_df = df    #checkpoint: store user-uploaded history in a df
-
-                    df = add_domain(df)
-                    if browser == "chrome":
-                        df["visit_time"] = df["visit_time"].apply(chrome_time_to_datetime) #human-readable time
-                    elif browser == "safari":
-                        df["visit_time"] = df["visit_time"].apply(safari_time_to_datetime) #human-readable time
-                    #elif browser == "firefox":
-                    #    df["visit_time"] = df["visit_time"].apply(firefox_time_to_datetime) #human-readable time
-                    else:
-                        print("Unknown browser, can't convert the time")
-                        st.error("Unknown browser, can't convert the time")
-                    
-                    st.session_state.raw_visit_data = df                  #checkpoint: save raw visit data
-                        
-                    df = split_sessions(df)     #record sessions > visits
-                    if df.empty:  # ADD THIS
-                        st.error("No browsing sessions could be created from your data")
-                        st.stop()
-                    df = add_session_length(df)
-                    st.session_state.raw_session_data = df       #checkpoint: save raw data in sessions
+                    with stage("process upload"):
+                        store = process_history_files(uploaded_files, digests, sql_keywords)
+                    if store is not None:
+                        cache.put(cache_key, (st.session_state.browser, store, sql_keywords), store.nbytes(),
+                                  st.session_state.upload_owner)
+                if store is not None:
+                    if 'ingest' in st.session_state:    #a smaller or cached file replaced one still being read
+                        st.session_state.pop('ingest').cancel()
+                    st.session_state.history = HistoryView(store)   #checkpoint: compact visits + sessions (pages materialize tables from it)
+                    st.session_state.sql_removed = dict(sql_keywords)
+                    st.session_state.upload_key = upload_key
+
+            follow_ingest()     #newest partial (or finished) store of a file being read in the background
+
+            if 'history' in st.session_state:
+                #only the visits matching added/removed keywords are touched; the file isn't read again
+                history = st.session_state.history
+                with stage("apply keywords", rows_in=len(history.store)) as s:
+                    history.set_keywords(() if use_pushdown else st.session_state.keywords)
+                    s.rows_out = len(history)
+                st.session_state.keywords.update(st.session_state.sql_removed if use_pushdown else history.removed_counts())
+                if len(history) == 0:   #everything was filtered out
+                    del st.session_state.history
+                    if 'ingest' not in st.session_state:    #a file still being read keeps going
+                        st.session_state.pop('upload_key', None)
+                    st.error("There is no browsing data left after filtering your keywords.")
+
+        removed = {k: v for k, v in st.session_state.keywords.items() if v}
+        if removed and 'history' in st.session_state:
+            st.caption("Rows removed per keyword: " + ", ".join(f"{k} ({v:,})" for k, v in removed.items()))
 
     except Exception as e:
         st.error(f"Unable to read the file. Error: {e}")
+    if profiler is not None and profiler.records:   #keep the last run that did any work
+        st.session_state.performance = profiler
+
+if record_performance:
+    with st.expander("Performance", expanded=True):
+        performance = st.session_state.get('performance')
+        if performance is None:
+            st.caption("Upload a file or change your keywords to time each step.")
+        else:
+            st.dataframe(performance.table(), hide_index=True, width="stretch")
+            st.caption("Steps that run once per chunk are added up. Memory is the change in the server's memory use, which other sessions share.")
+            col1, col2 = st.columns(2)
+            with col1:
+                st.download_button("Download as JSON lines", performance.log_lines(), file_name="stages.jsonl")
+            with col2:
+                st.download_button("Download as Prometheus metrics", performance.prometheus(), file_name="stages.prom")
+
+    #server-wide numbers (every visitor's uploads), so only shown next to the timings
+    with st.expander("Upload cache statistics", expanded=False):
+        st.json(get_history_cache().stats())
+        st.markdown("Uploaded files (disk usage and open database handles)")
+        st.json(get_upload_store().stats())
 
 st.markdown("""
 #### Privacy
-We don't save your data or send it anywhere. After you upload your file, it is only stored within your current **session state**.   
-When you refresh (Cmd/Ctrl + R) or close the tab (Cmd/Ctrl + W), the data will be cleared. (This is different from a [browser cache](https://pressidium.com/blog/browser-cache-work/#what-is-the-browser-cache), which you would need to clear manually.)
+We don't send your data anywhere. While your session is open, your file and the results made from it are kept on this server: in your **session state**, and in a server-side cache so that reloading the same file is instant. Large files are also kept on the server's disk (readable only by the app) while they're being used.   
+When you refresh (Cmd/Ctrl + R) or close the tab (Cmd/Ctrl + W), your session ends and all of this is deleted; anything left unused for an hour is deleted too. (This is different from a [browser cache](https://pressidium.com/blog/browser-cache-work/#what-is-the-browser-cache), which you would need to clear manually.)
 
 More information about session states [here](https://docs.streamlit.io/develop/api-reference/caching-and-state/st.session_state)!
 """)
\ No newline at end of file
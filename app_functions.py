@@ -1,58 +1,381 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
+import re
+import os
+import stat
+import contextlib
+import contextvars
+import json
+import logging
+import time
+import hashlib
 import sqlite3
+import shutil
 import tempfile
-from urllib.parse import urlparse
+import threading
+import weakref
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from collections import Counter, OrderedDict, defaultdict
+from urllib.parse import unquote_plus, urlparse
 from datetime import datetime, timedelta, timezone
 import altair as alt
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pandas.api.types import union_categoricals
+from wordcloud import STOPWORDS
+
+# ------------------------------------------------
+# Stage timing (off unless a StageProfiler is active)
+# ------------------------------------------------
+
+STAGE_LOG = logging.getLogger("browsing_history.stages")  #one JSON line per finished stage while profiling
+_active_profiler = contextvars.ContextVar("active_profiler", default=None) #each session's script thread has its own
+_PAGE_MB = (os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096) / 2**20
+
+#resident memory of the server process in MB (None where /proc isn't available)
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * _PAGE_MB
+    except (OSError, ValueError, IndexError):
+        return None
+
+#handle for a stage while it runs: set rows_out (and rows_in if it wasn't known up front)
+class Stage:
+    __slots__ = ("name", "rows_in", "rows_out")
+
+    def __init__(self, name, rows_in=None):
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NO_STAGE = Stage("") #returned while nothing is profiled; rows set on it are ignored
+
+#durations, rows and memory deltas of the stages run while active(); stages with the same path add up (e.g. per chunk)
+class StageProfiler:
+    def __init__(self):
+        self.records = {}   #(outer stage names..., name) -> totals
+        self.path = ()
+
+    @contextlib.contextmanager
+    def active(self):
+        token = _active_profiler.set(self)
+        try:
+            yield self
+        finally:
+            _active_profiler.reset(token)
+
+    @contextlib.contextmanager
+    def run(self, stage):
+        outer = self.path
+        self.path = outer + (stage.name,)
+        self.records.setdefault(self.path, {"calls": 0, "seconds": 0.0, "rows_in": None, "rows_out": None,
+                                            "memory_delta_mb": None})   #listed in the order stages start
+        rss_before = rss_mb()
+        start = time.perf_counter()
+        try:
+            yield stage
+        finally:
+            seconds = time.perf_counter() - start
+            rss_after = rss_mb()
+            memory = rss_after - rss_before if rss_before is not None and rss_after is not None else None
+            self._add(self.path, seconds, stage.rows_in, stage.rows_out, memory)
+            self.path = outer
+
+    def _add(self, path, seconds, rows_in, rows_out, memory):
+        record = self.records[path]
+        record["calls"] += 1
+        record["seconds"] += seconds
+        for key, value in (("rows_in", rows_in), ("rows_out", rows_out), ("memory_delta_mb", memory)):
+            if value is not None:
+                record[key] = (record[key] or 0) + value
+        if STAGE_LOG.isEnabledFor(logging.INFO):
+            STAGE_LOG.info(json.dumps({"stage": "/".join(path), "seconds": round(seconds, 6), "rows_in": rows_in,
+                                       "rows_out": rows_out, "memory_delta_mb": memory}))
+
+    #one row per stage in the order they started, nested stages indented under their parent
+    def table(self):
+        return pd.DataFrame([{
+            "stage": "\u2003" * (len(path) - 1) + path[-1],
+            "calls": record["calls"],
+            "seconds": round(record["seconds"], 4),
+            "rows_in": record["rows_in"],
+            "rows_out": record["rows_out"],
+            "rows_per_s": round(record["rows_in"] / record["seconds"]) if record["rows_in"] and record["seconds"] else None,
+            "memory_delta_mb": None if record["memory_delta_mb"] is None else round(record["memory_delta_mb"], 1),
+        } for path, record in self.records.items()], columns=["stage", "calls", "seconds", "rows_in", "rows_out",
+                                                               "rows_per_s", "memory_delta_mb"]
+        ).astype({"rows_in": "Int64", "rows_out": "Int64", "rows_per_s": "Int64"})
+
+    #the same totals as JSON lines (one per stage)
+    def log_lines(self):
+        return "\n".join(json.dumps({"stage": "/".join(path), **record}) for path, record in self.records.items())
+
+    #the same totals in Prometheus text exposition format
+    def prometheus(self):
+        metrics = (("seconds", "history_stage_seconds_total", "Time spent in the stage"),
+                   ("calls", "history_stage_calls_total", "Times the stage ran"),
+                   ("rows_in", "history_stage_rows_in_total", "Rows going into the stage"),
+                   ("rows_out", "history_stage_rows_out_total", "Rows coming out of the stage"),
+                   ("memory_delta_mb", "history_stage_memory_delta_megabytes", "Change in server RSS over the stage"))
+        lines = []
+        for key, metric, help_text in metrics:
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {'gauge' if key == 'memory_delta_mb' else 'counter'}"]
+            for path, record in self.records.items():
+                if record[key] is not None:
+                    label = "/".join(path).replace("\\", "\\\\").replace('"', '\\"')
+                    lines.append(f'{metric}{{stage="{label}"}} {record[key]:g}')
+        return "\n".join(lines) + "\n"
+
+#time a pipeline stage: with stage("add domain", rows_in=len(df)) as s: ...; s.rows_out = len(result)
+#costs one context variable lookup when no profiler is active
+def stage(name, rows_in=None):
+    profiler = _active_profiler.get()
+    if profiler is None:
+        return _NO_STAGE
+    return profiler.run(Stage(name, rows_in))
+
+#make [profiler] collect the stages run inside the with-block (None: record nothing)
+def profile_stages(profiler):
+    return profiler.active() if profiler is not None else contextlib.nullcontext()
 
 # ----------------------------
 # Chrome History file handling
 # ----------------------------
 
-#save streamlit file to temp file on disc
+COPY_BLOCK_BYTES = 1 << 20 #copy uploads 1 MB at a time
+
+#save streamlit file to temp file on disc (in fixed-size blocks, so no second full copy is held in memory)
 def save_uploaded_file_to_temp(uploaded_file):
+    uploaded_file.seek(0)
     tmp = tempfile.NamedTemporaryFile(delete=False)
-    tmp.write(uploaded_file.read())
+    shutil.copyfileobj(uploaded_file, tmp, COPY_BLOCK_BYTES)
     tmp.close()
     return tmp.name
 
+# -------------------------------------------------
+# Upload store (one file per content, cleaned up)
+# -------------------------------------------------
+
+UPLOAD_DIR = Path(tempfile.gettempdir()) / "browsing-history-uploads"
+UPLOAD_TTL_S = 60 * 60  #unused upload files are swept after an hour
+IN_MEMORY_MAX_BYTES = 64 * 1024 * 1024 #smaller uploads are deserialized into SQLite instead of written to disk
+
+_db_handles = {"open": 0, "opened": 0}
+_db_handles_lock = threading.Lock()
+
+#sqlite connection counted in _db_handles while it's open
+class CountedConnection(sqlite3.Connection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._counted = True
+        with _db_handles_lock:
+            _db_handles["open"] += 1
+            _db_handles["opened"] += 1
+
+    def close(self):
+        if getattr(self, "_counted", False):
+            self._counted = False
+            with _db_handles_lock:
+                _db_handles["open"] -= 1
+        super().close()
+
+    def __del__(self):
+        self.close()
+
+#open a history db read-only: a path is opened immutable (no locking or journal checks),
+#bytes (a small upload) are deserialized into an in-memory database without touching disk
+def connect_history_db(source):
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        if bytes(source[18:20]) == b"\x02\x02":   #WAL file (Safari, Firefox): a memory db can't open it, mark it rollback
+            source = bytearray(source)
+            source[18:20] = b"\x01\x01"
+        conn = sqlite3.connect(":memory:", factory=CountedConnection)
+        conn.deserialize(source)
+        return conn
+    uri = Path(source).resolve().as_uri() + "?mode=ro&immutable=1"
+    return sqlite3.connect(uri, uri=True, factory=CountedConnection)
+
+#whether this sqlite build can load a database from bytes (python 3.11+, sqlite with serialize support)
+def can_deserialize():
+    return hasattr(sqlite3.Connection, "deserialize")
+
+#[directory], created readable by this user only; one that's someone else's (or a symlink) is swapped for a fresh
+#private temp directory, and one of ours with looser permissions is tightened
+def private_directory(directory):
+    directory = Path(directory)
+    directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+    info = os.lstat(directory)
+    if stat.S_ISLNK(info.st_mode) or (hasattr(os, "getuid") and info.st_uid != os.getuid()):
+        return Path(tempfile.mkdtemp(prefix="browsing-history-uploads-"))
+    if info.st_mode & 0o077:
+        os.chmod(directory, 0o700)
+    return directory
+
+#uploads kept on disk as <sha256>.sqlite, shared by every session uploading the same bytes
+#files go away when no session holds them anymore, or after UPLOAD_TTL_S without use
+class UploadStore:
+    def __init__(self, directory=UPLOAD_DIR, ttl_s=UPLOAD_TTL_S, in_memory_max_bytes=IN_MEMORY_MAX_BYTES):
+        self.directory = private_directory(directory)
+        self.ttl_s = ttl_s
+        self.in_memory_max_bytes = in_memory_max_bytes if can_deserialize() else 0
+        self.owners = {}    #digest -> ids of the sessions that uploaded it
+        self.pins = {}      #digest -> loads reading the file right now
+        self.writes = 0
+        self.reuses = 0
+        self.in_memory = 0
+        self.deleted = 0
+        self.lock = threading.Lock() #shared by every session's script thread
+
+    def _path(self, digest):
+        return self.directory / f"{digest}.sqlite"
+
+    #source for connect_history_db while the with-block runs; [owner] is the session's UploadOwner
+    @contextlib.contextmanager
+    def lease(self, uploaded_file, digest, owner):
+        if uploaded_file.size <= self.in_memory_max_bytes:
+            with self.lock:
+                self.in_memory += 1
+            yield uploaded_file.getvalue() #UploadedFile is a BytesIO: no copy until sqlite deserializes it
+            return
+        path = self._path(digest)
+        with self.lock:
+            self.pins[digest] = self.pins.get(digest, 0) + 1
+            if digest not in self.owners:
+                self.owners[digest] = set()
+            if id(owner) not in self.owners[digest]:
+                self.owners[digest].add(id(owner))
+                weakref.finalize(owner, self.release, digest, id(owner)) #session ended
+            if path.exists():
+                self.reuses += 1
+                os.utime(path)
+            else:
+                tmp = self.directory / f"{digest}.{threading.get_ident()}.part"
+                tmp.unlink(missing_ok=True)    #left over from a crashed write
+                #created owner-only (0600) and never through an existing file
+                fd = os.open(tmp, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o600)
+                with stage("write upload to disk"), os.fdopen(fd, "wb") as f:
+                    uploaded_file.seek(0)
+                    shutil.copyfileobj(uploaded_file, f, COPY_BLOCK_BYTES)
+                os.replace(tmp, path)   #never expose a half-written file under its final name
+                self.writes += 1
+        try:
+            yield str(path)
+        finally:
+            with self.lock:
+                self.pins[digest] -= 1
+                if not self.pins[digest]:
+                    del self.pins[digest]
+            self.sweep()
+
+    #a session is gone: delete its files nobody else holds
+    def release(self, digest, owner_id):
+        with self.lock:
+            owners = self.owners.get(digest)
+            if owners is None:
+                return
+            owners.discard(owner_id)
+            if not owners and digest not in self.pins:
+                del self.owners[digest]
+                self._delete(self._path(digest))
+
+    #delete files not read for ttl_s (also leftovers from earlier server runs)
+    def sweep(self):
+        cutoff = time.time() - self.ttl_s
+        with self.lock:
+            for entry in os.scandir(self.directory):
+                digest = entry.name.split(".", 1)[0]
+                if digest not in self.pins and entry.stat().st_mtime < cutoff:
+                    self.owners.pop(digest, None)
+                    self._delete(Path(entry.path))
+
+    def _delete(self, path):
+        try:
+            path.unlink()
+            self.deleted += 1
+        except FileNotFoundError:
+            pass
+
+    def stats(self):
+        with self.lock:
+            files = [e for e in os.scandir(self.directory) if e.is_file()]
+            with _db_handles_lock:
+                handles = dict(_db_handles)
+            return {
+                "files": len(files),
+                "disk_bytes": sum(e.stat().st_size for e in files),
+                "in_use": len(self.pins),
+                "writes": self.writes,
+                "reuses": self.reuses,
+                "in_memory": self.in_memory,
+                "deleted": self.deleted,
+                "open_db_handles": handles["open"],
+                "db_handles_opened": handles["opened"],
+            }
+
+#kept in a session's state; when the session ends and it's garbage collected, its upload files and cached histories
+#are released
+class UploadOwner:
+    pass
+
+#one upload store for the whole server process
+@st.cache_resource
+def get_upload_store():
+    return UploadStore()
+
 #detect the browser of the history file (based on db titles)
 #might create weird errors for Opera, etc. because they have the same naming conventions as chrome
 def detect_browser(db_path):
     try:
-        conn = sqlite3.connect(db_path)
+        browser = history_browser(db_path)
+    except sqlite3.Error as e:
+        st.error(f"Database error: {e}")
+        return "unknown"
+    if browser == "unknown":
+        st.error("Could not successfully interpret your file. App is currently not compatible with this browser.")
+    return browser
+
+#browser of a history db from its tables, without messages (raises sqlite3.Error if it isn't a database)
+def history_browser(db_path):
+    conn = connect_history_db(db_path)
+    try:
         tables = {r[0] for r in conn.execute(
             "SELECT name FROM sqlite_master WHERE type='table'" #select all tables
         )}
+    finally:
         conn.close()
-    except sqlite3.Error as e:
-        st.error(f"Database error: {e}")
-        return "unknown"
     if "urls" in tables and "visits" in tables:
         return "chrome"
     elif "history_items" in tables and "history_visits" in tables:
         return "safari"
-    #elif "moz_places" in tables and "moz_historyvisits" in tables:
-    #    return "firefox"
-    else:
-        st.error("Could not successfully interpret your file. App is currently not compatible with this browser.")
-        return "unknown"
+    elif "moz_places" in tables and "moz_historyvisits" in tables:
+        return "firefox"
+    return "unknown"
+
+CHROME_HISTORY_QUERY = """ 
+    SELECT
+        urls.url,
+        urls.title,
+        visits.visit_time
+    FROM urls
+    JOIN visits ON urls.id = visits.url
+    ORDER BY visits.visit_time
+""" #join urls by visit based on id and sort
+#urls.visit_count
 
 #load SQLite db from chrome to a pandas df
 def load_chrome_history_db(db_path):
-    conn = sqlite3.connect(db_path)
-    query = """ 
-        SELECT
-            urls.url,
-            urls.title,
-            visits.visit_time
-        FROM urls
-        JOIN visits ON urls.id = visits.url
-        ORDER BY visits.visit_time
-    """ #join urls by visit based on id and sort
-    #urls.visit_count
-    df = pd.read_sql_query(query, conn)
+    conn = connect_history_db(db_path)
+    df = pd.read_sql_query(CHROME_HISTORY_QUERY, conn)
     conn.close()
     return df
 
@@ -60,31 +383,36 @@ def load_chrome_history_db(db_path):
 def _cols(conn, table):
     return {r[1] for r in conn.execute(f"PRAGMA table_info({table})")}
 
-#load SQLite db from safari to a pandas df (chrome format)
-def load_safari_history_db(db_path):
-    conn = sqlite3.connect(db_path)
-    #handle safari variants (items and visits)
+#handle safari variants (title lives on items or visits, or is missing)
+def _safari_title_expr(conn):
     items_cols  = _cols(conn, "history_items")
     visits_cols = _cols(conn, "history_visits")
     if "title" in items_cols:
-        title_expr = "items.title"
+        return "items.title"
     elif "title" in visits_cols:
-        title_expr = "visits.title"
+        return "visits.title"
     elif "page_title" in visits_cols:
-        title_expr = "visits.page_title"
+        return "visits.page_title"
     else:
-        title_expr = "NULL"
-    query = f""" 
+        return "NULL"
+
+#safari visits joined to their urls, in chrome format
+def _safari_history_query(conn):
+    return f""" 
         SELECT
             items.url AS url,
-            {title_expr} AS title,
+            {_safari_title_expr(conn)} AS title,
             visits.visit_time AS visit_time
         FROM history_visits AS visits
         JOIN history_items AS items
             ON visits.history_item = items.id
         ORDER BY visits.visit_time
     """ #join urls by visit based on id and sort
-    df = pd.read_sql_query(query, conn)
+
+#load SQLite db from safari to a pandas df (chrome format)
+def load_safari_history_db(db_path):
+    conn = connect_history_db(db_path)
+    df = pd.read_sql_query(_safari_history_query(conn), conn)
     conn.close()
     return df
 
@@ -98,21 +426,70 @@ def load_safari_history_db(db_path):
 #        ) AS counts
 #        ON counts.history_item = items.id
 
-#load SQLite db from firefox to pandas df (chrome format)
-def load_firefox_history_db(db_path):
-    conn = sqlite3.connect(db_path)
-    df = pd.read_sql_query("""
+#firefox visits joined to their places, in chrome format (+ the place's reversed host when [rev_host])
+def _firefox_history_query(rev_host=False):
+    return f"""
         SELECT
             places.url,
             places.title,
-            visits.visit_date AS visit_time,
-        FROM moz_places AS places
-        JOIN moz_historyvisits AS visits ON visits.place_id = places.id
-        ORDER BY visits.visit_time
-    """, conn)
-    #places.visit_count
+            visits.visit_date AS visit_time{", places.rev_host" if rev_host else ""}
+        FROM moz_historyvisits AS visits
+        JOIN moz_places AS places ON visits.place_id = places.id
+        ORDER BY visits.visit_date
+    """ #places.visit_count
+
+#load SQLite db from firefox to pandas df (chrome format)
+def load_firefox_history_db(db_path):
+    conn = connect_history_db(db_path)
+    df = pd.read_sql_query(_firefox_history_query(), conn)
     conn.close()
     return df
+# -----------------
+# Keyword filtering
+# -----------------
+
+#compile all keywords into one case-insensitive alternation regex (None if nothing to match)
+def compile_keyword_pattern(keywords):
+    words = sorted({k for k in keywords if k}, key=len, reverse=True) #longest first so overlaps resolve the same way
+    if not words:
+        return None
+    return "|".join(re.escape(w) for w in words) #keywords are literal text, not regexes
+
+#boolean mask of rows containing any keyword (one vectorized pass per column) + rows matched per keyword
+def keyword_filter_mask(df, keywords, columns=("url", "title")):
+    counts = {k: 0 for k in keywords}
+    matched = np.zeros(len(df), dtype=bool)
+    pattern = compile_keyword_pattern(keywords)
+    if pattern is None or df.empty:
+        return pd.Series(matched, index=df.index), counts
+
+    texts = []
+    for col in columns:
+        if col not in df.columns:
+            continue
+        text = df[col]
+        if text.dtype.kind not in "OSU" and not pd.api.types.is_string_dtype(text):
+            text = text.astype(str)
+        matched |= text.str.contains(pattern, case=False, regex=True, na=False).to_numpy()
+        texts.append(text)
+
+    #only the dropped rows are scanned again to attribute them to keywords
+    if matched.any():
+        for keyword in counts:
+            if not keyword:
+                continue
+            hit = np.zeros(int(matched.sum()), dtype=bool)
+            for text in texts:
+                hit |= text[matched].str.contains(keyword, case=False, regex=False, na=False).to_numpy()
+            counts[keyword] = int(hit.sum())
+    return pd.Series(matched, index=df.index), counts
+
+#drop every row whose url or title contains a keyword (keywords stored as a dic: keyword -> rows removed)
+def filter_data(df, keywords):
+    matched, counts = keyword_filter_mask(df, keywords)
+    keywords.update(counts) #record how many rows each keyword removed
+    return df[~matched.to_numpy()]
+
 # -------------------------------
 # Raw data cleaning (browser data)
 # -------------------------------
@@ -147,71 +524,1713 @@ def firefox_time_to_datetime(firefox_timestamp):
     except:
         return None
 
+# ---------------------------------------------------
+# Vectorized timestamp conversion (whole time columns)
+# ---------------------------------------------------
+
+CHROME_EPOCH_OFFSET_S = 11_644_473_600 #seconds from 1601-01-01 to 1970-01-01
+SAFARI_EPOCH_OFFSET_S = 978_307_200    #seconds from 1970-01-01 to 2001-01-01
+_MIN_UNIX_S = pd.Timestamp.min.value // 1_000_000_000 + 1 #datetime64[ns] only spans ~1677-2262
+_MAX_UNIX_S = pd.Timestamp.max.value // 1_000_000_000
+
+#int64/float64 values of a raw time column + mask of usable (non-null, finite, int64-sized) entries
+def _raw_time_values(col):
+    values = pd.to_numeric(pd.Series(col), errors='coerce')
+    if pd.api.types.is_integer_dtype(values.dtype):   #nullable Int64 can hold NA (a NULL visit_time)
+        return values.to_numpy(dtype=np.int64, na_value=0), values.notna().to_numpy()
+    floats = values.to_numpy(dtype=np.float64, na_value=np.nan)
+    valid = np.isfinite(floats) & (np.abs(floats) < 2.0 ** 62)
+    return floats, valid
+
+#microseconds -> whole seconds, rounding halves to even like round() in the per-row converters
+def _microseconds_to_seconds(micros):
+    seconds, remainder = np.divmod(micros, 1_000_000)
+    seconds += (remainder > 500_000) | ((remainder == 500_000) & (seconds % 2 == 1))
+    return seconds
+
+#unix seconds (int64) -> datetime64[ns, UTC] series, NaT where invalid or out of range
+def _unix_seconds_to_datetime(seconds, valid, index):
+    valid = valid & (seconds >= _MIN_UNIX_S) & (seconds <= _MAX_UNIX_S)
+    nanos = np.where(valid, seconds, 0).astype(np.int64) * 1_000_000_000
+    times = nanos.view('datetime64[ns]')
+    times[~valid] = np.datetime64('NaT')
+    return pd.Series(pd.DatetimeIndex(times).tz_localize('UTC'), index=index)
+
+#integer microseconds (int or float column) -> int64 micros + valid mask
+def _raw_microseconds(col):
+    values, valid = _raw_time_values(col)
+    if values.dtype != np.int64:
+        values = np.where(valid, values, 0).astype(np.int64)
+    return values, valid
+
+#chrome column (microseconds since 1601-01-01 UTC) -> datetime64[ns, UTC]
+def chrome_column_to_datetime(col):
+    micros, valid = _raw_microseconds(col)
+    seconds = _microseconds_to_seconds(micros) - CHROME_EPOCH_OFFSET_S
+    return _unix_seconds_to_datetime(seconds, valid, getattr(col, 'index', None))
+
+#safari column (CoreData seconds since 2001-01-01 UTC, float) -> datetime64[ns, UTC]
+def safari_column_to_datetime(col):
+    values, valid = _raw_time_values(col)
+    seconds = np.rint(np.where(valid, values, 0)).astype(np.int64) + SAFARI_EPOCH_OFFSET_S
+    return _unix_seconds_to_datetime(seconds, valid, getattr(col, 'index', None))
+
+#firefox column (microseconds since 1970-01-01 UTC) -> datetime64[ns, UTC]
+def firefox_column_to_datetime(col):
+    micros, valid = _raw_microseconds(col)
+    return _unix_seconds_to_datetime(_microseconds_to_seconds(micros), valid, getattr(col, 'index', None))
+
 def timeframe(df, col): #show timeframe and add to df
     return df[col].min().strftime("%m/%d/%Y %H:%M:%S %p"), df[col].max().strftime("%m/%d/%y %H:%M:%S %p")
 
-#add simplified domain to a df
-def add_domain(df):
+#get domain name
+def extract_domain(url):
+    if not isinstance(url, str):
+        return ""
+
+    if url.startswith("file://"): #user saved files
+        return "Local Files"
+
+    parsed = urlparse(url)
+    dom = parsed.netloc.split(":")[0]
+    if dom.startswith("www."):
+        dom = dom[4:]
+    return dom if dom else "Unknown"
+
+#plain scheme://host[:port] followed by /, ?, # or the end (anything else goes through urlparse)
+_SIMPLE_URL_HOST = re.compile(r"^[A-Za-z][A-Za-z0-9+.-]*://([A-Za-z0-9._~%!$&'()*+,;=-]*)(?::\d*)?(?:[/?#]|$)")
+
+#extract_domain for one url, skipping urlparse when the url has the plain scheme://host shape
+def _extract_domain_fast(url):
+    if isinstance(url, str) and not url.startswith("file://") and "\t" not in url and "\n" not in url and "\r" not in url:
+        match = _SIMPLE_URL_HOST.match(url)
+        if match:
+            dom = match.group(1)
+            if dom.startswith("www."):
+                dom = dom[4:]
+            return dom if dom else "Unknown"
+    return extract_domain(url)
+
+#bounded LRU memo of url -> domain (one per session, so it survives re-uploads)
+class DomainCache:
+    def __init__(self, maxsize=500_000):
+        self.maxsize = maxsize
+        self.domains = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.domains)
+
+    #cached domains for [urls] (None where missing)
+    def lookup(self, urls):
+        found = []
+        for url in urls:
+            dom = self.domains.get(url)
+            if dom is not None:
+                self.domains.move_to_end(url)
+            found.append(dom)
+        hits = sum(dom is not None for dom in found)
+        self.hits += hits
+        self.misses += len(found) - hits
+        return found
+
+    #domain for one url, memoized (also registered as a sqlite function for pushdown loading)
+    def domain(self, url):
+        dom = self.domains.get(url)
+        if dom is None:
+            self.misses += 1
+            dom = _extract_domain_fast(url)
+            self.store([url], [dom])
+        else:
+            self.hits += 1
+            self.domains.move_to_end(url)
+        return dom
+
+    def store(self, urls, domains):
+        self.domains.update(zip(urls, domains))
+        while len(self.domains) > self.maxsize:
+            self.domains.popitem(last=False)
+
+#domains for an array of distinct urls: regex fast path for ordinary urls, urlparse for the rest
+def _extract_domains(urls):
+    urls = pd.Series(urls, dtype=object)
+    is_str = urls.map(type).eq(str)
+    text = urls.where(is_str, "")
+    host = text.str.extract(_SIMPLE_URL_HOST, expand=False)
+    simple = is_str & host.notna() & ~text.str.startswith("file://") & ~text.str.contains("[\t\r\n]", regex=True)
+
+    host = host.where(simple, "").str.removeprefix("www.")
+    domains = host.where(host != "", "Unknown").astype(object)
+    domains[~is_str] = ""
+    slow = is_str & ~simple
+    domains[slow] = [extract_domain(url) for url in urls[slow]]
+    return domains.to_numpy()
+
+#add simplified domain to a df (each distinct url is parsed once; [cache] carries results across uploads)
+def add_domain(df, cache=None):
+    df = df.copy()
+    codes, uniques = pd.factorize(df["url"], use_na_sentinel=True)
+    uniques = np.asarray(uniques, dtype=object)
+
+    if cache is None:
+        domains = _extract_domains(uniques)
+    else:
+        domains = np.array(cache.lookup(uniques), dtype=object)
+        missing = np.flatnonzero(pd.isna(domains))
+        if missing.size:
+            domains[missing] = _extract_domains(uniques[missing])
+            cache.store(uniques[missing], domains[missing])
+
+    domains = np.append(domains, "") #missing urls (code -1) get ""
+    df["domain"] = domains[codes]
+    return df
+
+_WEB_URL = re.compile(r"^https?://", re.I)
+
+#add_domain for firefox rows carrying moz_places.rev_host (the host reversed + '.', e.g. 'moc.elgoog.www.')
+#http(s) urls take their domain from the host firefox already parsed; only other urls (file://, about:...) are parsed
+def add_domain_from_rev_host(df, cache=None):
     df = df.copy()
+    rev_host = df.pop("rev_host")
+    codes, hosts = pd.factorize(rev_host, use_na_sentinel=True)
+    hosts = pd.Series(np.asarray(hosts, dtype=object), dtype=object).str[-2::-1].str.removeprefix("www.")
+    domains = np.append(hosts.where(hosts != "", "Unknown").to_numpy(dtype=object), None)[codes]
 
-    #get domain name
-    def extract_domain(url):
-        if not isinstance(url, str):
-            return ""
-        
-        if url.startswith("file://"): #user saved files
-            return "Local Files"
-
-        parsed = urlparse(url)
-        dom = parsed.netloc.split(":")[0]
-        if dom.startswith("www."):
-            dom = dom[4:]
-        return dom if dom else "Unknown"
-
-    df["domain"] = df["url"].apply(extract_domain)
+    parse = ~df["url"].str.match(_WEB_URL, na=False).to_numpy() | (codes < 0)
+    if parse.any():
+        domains[parse] = add_domain(df.loc[parse, ["url"]], cache)["domain"].to_numpy()
+    df["domain"] = domains
     return df
 
+# ------------------------------------------
+# Search queries (engine + query from the url)
+# ------------------------------------------
+
+#search engine -> compiled url pattern whose group 1 is the url-encoded query; add an entry to recognize another engine
+SEARCH_ENGINES = {
+    "Google": re.compile(r"^https?://(?:www\.)?google\.[a-z]{2,3}(?:\.[a-z]{2})?/search\?(?:[^#]*&)?q=([^&#]*)", re.I),
+    "Bing": re.compile(r"^https?://(?:www\.|cn\.)?bing\.com/search\?(?:[^#]*&)?q=([^&#]*)", re.I),
+    "DuckDuckGo": re.compile(r"^https?://(?:html\.|lite\.)?duckduckgo\.com/(?:html/|lite/)?\?(?:[^#]*&)?q=([^&#]*)", re.I),
+    "YouTube": re.compile(r"^https?://(?:www\.|m\.)?youtube\.com/results\?(?:[^#]*&)?search_query=([^&#]*)", re.I),
+    "Yahoo": re.compile(r"^https?://(?:[a-z]+\.)?search\.yahoo\.com/search[^?#]*\?(?:[^#]*&)?p=([^&#]*)", re.I),
+}
+
+#(engine, query) arrays for distinct urls: engine name and decoded query text, None where the url isn't a search
+def extract_search_queries(urls):
+    urls = pd.Series(np.asarray(urls, dtype=object))
+    engine = np.full(len(urls), None, dtype=object)
+    query = np.full(len(urls), None, dtype=object)
+    is_str = np.array(urls.map(type).eq(str))
+    todo = is_str.copy()
+    todo[is_str] = np.array(urls[is_str].str.contains("?", regex=False)) #every pattern needs a query string
+    for name, pattern in SEARCH_ENGINES.items():
+        found = urls[todo].str.extract(pattern, expand=False).dropna()
+        text = found.map(unquote_plus).str.strip()
+        text = text[text != ""] #an empty q= is the engine's home page, not a search
+        rows = text.index.to_numpy()
+        engine[rows] = name
+        query[rows] = text.to_numpy(dtype=object)
+        todo[rows] = False
+    return engine, query
+
+# ------------------------------------------------------
+# SQL pushdown loading (filter/convert inside SQLite)
+# ------------------------------------------------------
+
+#sql: raw microseconds -> unix seconds, halves rounded to even like the pandas converters (NULL if not a number)
+def _micros_to_unix_seconds_sql(col, offset_s):
+    us = f"CAST({col} AS INTEGER)"
+    return f"""CASE WHEN typeof({col}) IN ('integer', 'real') THEN
+        {us} / 1000000 - {offset_s}
+        + (CASE WHEN {us} % 1000000 > 500000 OR ({us} % 1000000 = 500000 AND ({us} / 1000000) % 2 = 1) THEN 1 ELSE 0 END)
+    END"""
+
+#sql: CoreData seconds (float) -> unix seconds, halves rounded to even like np.rint
+def _coredata_to_unix_seconds_sql(col):
+    whole = f"CAST({col} AS INTEGER)"
+    frac = f"({col} - {whole})"
+    return f"""CASE WHEN typeof({col}) IN ('integer', 'real') THEN
+        {whole} + {SAFARI_EPOCH_OFFSET_S}
+        + (CASE WHEN {frac} > 0.5 OR ({frac} = 0.5 AND {whole} % 2 != 0) THEN 1
+                WHEN {frac} < -0.5 OR ({frac} = -0.5 AND {whole} % 2 != 0) THEN -1 ELSE 0 END)
+    END"""
+
+#where each browser keeps urls, titles and times; the items table holds one row per distinct url
+def _pushdown_source(conn, browser):
+    if browser == "chrome":
+        return {
+            "items": "urls", "item_title": "title", "visit_title": None,
+            "time": _micros_to_unix_seconds_sql("visits.visit_time", CHROME_EPOCH_OFFSET_S),
+            "item": "visits.url",
+            "from": "visits CROSS JOIN temp.pushdown_items AS items ON items.id = visits.url",
+        }
+    elif browser == "safari":
+        title_expr = _safari_title_expr(conn)
+        on_items = title_expr == "items.title"
+        return {
+            "items": "history_items",
+            "item_title": "title" if on_items else None,
+            "visit_title": None if on_items or title_expr == "NULL" else title_expr,
+            "time": _coredata_to_unix_seconds_sql("visits.visit_time"),
+            "item": "visits.history_item",
+            "from": "history_visits AS visits CROSS JOIN temp.pushdown_items AS items ON items.id = visits.history_item",
+        }
+    elif browser == "firefox":
+        return {
+            "items": "moz_places", "item_title": "title", "visit_title": None,
+            "time": _micros_to_unix_seconds_sql("visits.visit_date", 0),
+            "item": "visits.place_id",
+            "order": "visits.visit_date",
+            "from": "moz_historyvisits AS visits CROSS JOIN temp.pushdown_items AS items ON items.id = visits.place_id",
+        }
+    raise ValueError(f"SQL pushdown is not available for {browser} history")
+
+#sql: text contains a keyword (sqlite's lower() only folds ASCII, so only ASCII keywords are pushed down)
+def _contains_sql(col):
+    return f"instr(lower(coalesce({col}, '')), ?) > 0"
+
+#load a chrome/safari/firefox history with keyword filtering, time conversion and domains done by SQLite
+#returns the same rows and columns as load_* -> filter_data -> add_domain -> *_column_to_datetime
+def load_history_pushdown(db_path, browser, keywords, cache=None):
+    cache = cache if cache is not None else DomainCache()
+    pushed = [k for k in keywords if k and k.isascii()]
+    conn = connect_history_db(db_path)
+    try:
+        conn.create_function("extract_domain", 1, cache.domain, deterministic=True)
+        source = _pushdown_source(conn, browser)
+
+        #per distinct url: domain + one flag per keyword (url, and title when it lives on the item)
+        flags, flag_params = [], []
+        for i, keyword in enumerate(pushed):
+            cond = _contains_sql("url")
+            flag_params.append(keyword.lower())
+            if source["item_title"]:
+                cond += f" OR {_contains_sql(source['item_title'])}"
+                flag_params.append(keyword.lower())
+            flags.append(f", ({cond}) AS kw{i}")
+        title_col = f", {source['item_title']} AS title" if source["item_title"] else ""
+        with stage("match urls in SQL"):
+            conn.execute("DROP TABLE IF EXISTS temp.pushdown_items")
+            conn.execute(
+                f"CREATE TEMP TABLE pushdown_items AS SELECT id, url{title_col}, extract_domain(url) AS domain{''.join(flags)} FROM {source['items']}",
+                flag_params,
+            )
+            conn.execute("CREATE INDEX temp.pushdown_items_id ON pushdown_items(id)")
+
+        #per visit: item flag, or the visit's own title
+        matches, match_params = [], []
+        for i, keyword in enumerate(pushed):
+            if source["visit_title"]:
+                matches.append(f"(items.kw{i} OR {_contains_sql(source['visit_title'])})")
+                match_params.append(keyword.lower())
+            else:
+                matches.append(f"items.kw{i}")
+
+        if pushed:
+            #rows removed per keyword, counted without returning any of them
+            with stage("count removed rows in SQL"):
+                totals = conn.execute(
+                    f"SELECT {', '.join(f'coalesce(SUM({m}), 0)' for m in matches)} FROM {source['from']}", match_params
+                ).fetchone()
+            keywords.update(zip(pushed, (int(t) for t in totals)))
+
+        #kept visits come back as (item id, [title,] seconds); strings are shared per distinct url below
+        visit_title = f", {source['visit_title']} AS title" if source["visit_title"] else ""
+        with stage("read SQL") as s:
+            visits = pd.read_sql_query(f"""
+                SELECT
+                    {source['item']} AS item{visit_title},
+                    {source['time']} AS visit_time
+                FROM {source['from']}
+                WHERE NOT ({' OR '.join(matches) or '0'})
+                ORDER BY {source.get('order', 'visits.visit_time')}
+            """, conn, params=match_params)
+            items = pd.read_sql_query("SELECT * FROM temp.pushdown_items", conn, index_col="id")
+            s.rows_out = len(visits)
+        conn.execute("DROP TABLE temp.pushdown_items")
+    finally:
+        conn.close()
+
+    pos = items.index.get_indexer(visits["item"])
+    if "title" in visits:
+        title = visits["title"]
+    elif "title" in items:
+        title = items["title"].take(pos).reset_index(drop=True)
+    else:
+        title = pd.Series(None, index=visits.index, dtype=object)
+    seconds = visits["visit_time"]
+    df = pd.DataFrame({
+        "url": items["url"].take(pos).reset_index(drop=True),
+        "title": title,
+        "visit_time": _unix_seconds_to_datetime(seconds.fillna(0).to_numpy(dtype=np.int64), seconds.notna().to_numpy(), visits.index),
+        "domain": items["domain"].take(pos).reset_index(drop=True),
+    })
+
+    rest = {k: keywords[k] for k in keywords if k not in pushed}
+    if rest: #non-ASCII keywords need Python's unicode-aware case folding
+        df = filter_data(df, rest)
+        keywords.update(rest)
+    return df.reset_index(drop=True)
+
+#for each visit, position of the first later visit to the same domain more than [gap] after it
+#(vectorized binary search inside each domain's block of the domain/time-sorted arrays)
+def _next_session_positions(times, block_end, gap):
+    lo = np.arange(1, len(times) + 1)
+    hi = block_end.copy()
+    target = times + gap
+    active = np.flatnonzero(lo < hi)
+    while active.size:
+        mid = (lo[active] + hi[active]) // 2
+        right = times[mid] <= target[active]
+        lo[active[right]] = mid[right] + 1
+        hi[active[~right]] = mid[~right]
+        active = active[lo[active] < hi[active]]
+    return lo
+
+#usable session title: non-empty and not the "Untitled" placeholder (later titles replace the placeholder)
+def _has_title(title):
+    return title.notna() & title.astype(str).str.strip().ne('') & title.ne('Untitled')
+
+SESSION_SHARD_MIN_VISITS = 1_000_000 #smaller histories are sessionized in one pass
+SESSION_WORKERS = min(os.cpu_count() or 1, 8)
+
+#threads for sharded sessionizing (numpy releases the GIL on the big array operations), shared by every session
+@st.cache_resource
+def get_session_pool():
+    return ThreadPoolExecutor(max_workers=SESSION_WORKERS, thread_name_prefix="sessions")
+
+#session start positions in domain/time-sorted arrays (one domain's visits are contiguous)
+def _session_starts(times, domains, gap):
+    n = len(times)
+    #contiguous block of rows per domain
+    block_starts = np.r_[0, np.flatnonzero(domains[1:] != domains[:-1]) + 1]
+    block_end = np.repeat(np.r_[block_starts[1:], n], np.diff(np.r_[block_starts, n]))
+
+    #session starts: each domain's first visit, then jump to the next visit past start + gap
+    next_start = _next_session_positions(times, block_end, gap)
+    is_start = np.zeros(n, dtype=bool)
+    frontier = block_starts
+    while frontier.size:
+        is_start[frontier] = True
+        jumped = next_start[frontier]
+        frontier = jumped[jumped < block_end[frontier]]
+    return np.flatnonzero(is_start)
+
+#_session_starts on [shards] slices cut at domain boundaries (about the same number of visits each), run in threads
+#domains never share a session, so the shards' starts concatenate into exactly the single-pass result
+def _sharded_session_starts(times, domains, gap, shards):
+    block_starts = np.r_[0, np.flatnonzero(domains[1:] != domains[:-1]) + 1]
+    targets = np.arange(1, shards) * len(times) // shards
+    cuts = np.unique(np.r_[0, block_starts[np.minimum(np.searchsorted(block_starts, targets), len(block_starts) - 1)],
+                           len(times)])
+    futures = [get_session_pool().submit(_session_starts, times[lo:hi], domains[lo:hi], gap)
+               for lo, hi in zip(cuts[:-1], cuts[1:])]
+    return np.concatenate([future.result() + lo for future, lo in zip(futures, cuts[:-1])])
+
+#sessions as row positions into df, in split_sessions order:
+#first and last visit, the visit whose title the session takes (-1 = "Untitled") and the visit count
+#histories of SESSION_SHARD_MIN_VISITS or more are split by domain across SESSION_WORKERS threads ([shards] overrides)
+def session_positions(df, session_length=30, shards=None):
+    visit_time = pd.to_datetime(df['visit_time'], utc=True)
+    valid = np.flatnonzero(visit_time.notna().to_numpy())
+    if valid.size == 0:
+        return pd.DataFrame({c: np.array([], dtype=np.int64) for c in ['first', 'last', 'title', 'visit_count']})
+
+    #group by domain and chronological sort (stable, like sort_values(['domain', 'visit_time']))
+    all_times = visit_time.to_numpy(dtype='datetime64[ns]').view('int64')
+    domain_codes = pd.factorize(df['domain'], sort=True)[0]
+    order = valid[np.lexsort((all_times[valid], domain_codes[valid]))]
+    times = all_times[order]
+    domains = domain_codes[order]
+    gap = pd.Timedelta(minutes=session_length).value
+    n = len(order)
+
+    if shards is None:
+        shards = SESSION_WORKERS if n >= SESSION_SHARD_MIN_VISITS else 1
+    if shards > 1:
+        starts = _sharded_session_starts(times, domains, gap, shards)
+    else:
+        starts = _session_starts(times, domains, gap)
+    ends = np.r_[starts[1:], n] - 1
+
+    #title: first visit in the session with a usable title
+    has_title = _has_title(df['title']).to_numpy()[order]
+    first_titled = np.minimum.reduceat(np.where(has_title, np.arange(n), n), starts)
+    title = np.where(first_titled < n, order[np.minimum(first_titled, n - 1)], -1)
+
+    sessions = pd.DataFrame({
+        'first': order[starts],
+        'last': order[ends],
+        'title': title,
+        'visit_count': ends - starts + 1,
+    })
+
+    #keep the original output order: finished sessions as they close, then each domain's last (open) session
+    is_last = np.r_[domains[starts][1:] != domains[starts][:-1], True]
+    return sessions.iloc[np.argsort(is_last, kind='stable')].reset_index(drop=True)
+
 #build df based on sessions instead of visits
+#a session starts at a visit and absorbs every visit to the same domain within [session_length] minutes of that start
 def split_sessions(df, session_length=30):
-    df = df.sort_values(['domain', 'visit_time']) #group by domain and chronological sort
-
-    current_sessions = {} #current tracked sessions. key: domain; value: {all the info}
-    all_sessions = [] #all completed sessions
-
-    #iterate thru all visits
-    for index, row in df.iterrows():
-        curr_domain = row['domain']
-        curr_visit_time = row['visit_time']
-        
-        if curr_domain in current_sessions: #not a new domain
-            curr_session = current_sessions[curr_domain] #get session info
-            #if it's been over 30m, start new session
-            if (curr_visit_time - curr_session['session_start']) > timedelta(minutes=session_length):
-                all_sessions.append(curr_session) #save previous session
-                current_sessions[curr_domain] = {
-                    'domain': curr_domain,
-                    'title': row['title'] if pd.notna(row['title']) and row['title'].strip() else 'Untitled',
-                    'url': row['url'],
-                    'session_start': curr_visit_time, #new session starts at curr time
-                    'session_end': curr_visit_time,
-                    'visit_count': 1
-                }
-            else: #continue extending current session
-                curr_session['session_end'] = curr_visit_time
-                curr_session['visit_count'] += 1
-                if (curr_session['title'] == 'Untitled' or not curr_session['title']) and pd.notna(row['title']) and row['title'].strip():
-                    curr_session['title'] = row['title']  #just update title to latest visit
-        else: #new domain (not tracking yet)
-            current_sessions[curr_domain] = {#add to tracked sessions
-                'domain': curr_domain,
-                'title': row['title'] if pd.notna(row['title']) and row['title'].strip() else 'Untitled',
-                'url': row['url'],
-                'session_start': curr_visit_time, #new session starts at curr time
-                'session_end': curr_visit_time,
-                'visit_count': 1
+    columns = ['domain', 'title', 'url', 'session_start', 'session_end', 'visit_count']
+    positions = session_positions(df, session_length)
+    if positions.empty:
+        return pd.DataFrame(columns=columns)
+
+    first = positions['first'].to_numpy()
+    titled = positions['title'].to_numpy() >= 0
+    visit_time = pd.to_datetime(df['visit_time'], utc=True)
+    title = df['title'].iloc[np.where(titled, positions['title'], 0)].reset_index(drop=True)
+    return pd.DataFrame({
+        'domain': df['domain'].iloc[first].reset_index(drop=True),
+        'title': title.where(titled, 'Untitled'),
+        'url': df['url'].iloc[first].reset_index(drop=True),
+        'session_start': visit_time.iloc[first].reset_index(drop=True),
+        'session_end': visit_time.iloc[positions['last']].reset_index(drop=True),
+        'visit_count': positions['visit_count'],
+    })[columns]
+
+# ------------------------------------------
+# Streaming ingestion (bounded working memory)
+# ------------------------------------------
+
+STREAM_CHUNK_ROWS = 100_000
+
+#raw visit query for a browser (same rows as the load_*_history_db functions)
+def _history_query(conn, browser):
+    if browser == "chrome":
+        return CHROME_HISTORY_QUERY
+    elif browser == "safari":
+        return _safari_history_query(conn)
+    elif browser == "firefox":
+        return _firefox_history_query(rev_host=True)  #domains come from rev_host, see add_domain_from_rev_host
+    raise ValueError(f"Streaming is not available for {browser} history")
+
+#time column converter for a browser
+def _time_converter(browser):
+    return {"chrome": chrome_column_to_datetime, "safari": safari_column_to_datetime,
+            "firefox": firefox_column_to_datetime}[browser]
+
+#yield raw (url, title, visit_time) chunks of a history db, oldest visits first
+def iter_history_chunks(db_path, browser, chunksize=STREAM_CHUNK_ROWS):
+    conn = connect_history_db(db_path)
+    try:
+        reader = pd.read_sql_query(_history_query(conn, browser), conn, chunksize=chunksize)
+        while True:
+            with stage("read SQL") as s:
+                chunk = next(reader, None)
+                s.rows_out = 0 if chunk is None else len(chunk)
+            if chunk is None:
+                break
+            yield chunk
+    finally:
+        conn.close()
+
+#split_sessions fed one time-ordered chunk at a time; sessions still open at a chunk boundary carry over
+class SessionBuilder:
+    def __init__(self, session_length=30):
+        self.gap = np.timedelta64(pd.Timedelta(minutes=session_length).value, 'ns')
+        self.session_length = session_length
+        self.open = None    #latest session per domain (indexed by domain), may still grow
+        self.closed = []    #frames of finished sessions
+
+    #add visits (with domain, title, url, visit_time) that are not older than anything added before
+    def add(self, visits):
+        visits = visits[visits['visit_time'].notna()]
+        if visits.empty:
+            return
+        if self.open is not None:
+            #visits within session_length of their domain's open session start extend that session
+            start = self.open['session_start'].reindex(visits['domain'].to_numpy())
+            times = visits['visit_time'].to_numpy(dtype='datetime64[ns]')
+            extends = (times - start.to_numpy(dtype='datetime64[ns]')) <= self.gap
+            self._extend(visits[extends])
+            visits = visits[~extends]
+            if visits.empty:
+                return
+
+        sessions = split_sessions(visits, self.session_length)
+        is_last = sessions.groupby('domain')['session_start'].transform('max').eq(sessions['session_start'])
+        latest = sessions[is_last].set_index('domain')
+        if self.open is not None:
+            replaced = self.open.index.isin(latest.index)
+            self.closed.append(self.open[replaced].reset_index())
+            latest = pd.concat([self.open[~replaced], latest])
+        self.closed.append(sessions[~is_last])
+        #own buffers: _extend writes into these columns, and under copy-on-write session_start/session_end can be
+        #views of one array (e.g. a single-visit session), so a write to one would show in the other
+        self.open = latest.copy()
+
+    def _extend(self, visits):
+        if visits.empty:
+            return
+        title = visits['title']
+        grouped = visits.assign(title=title.where(_has_title(title))).groupby('domain').agg(
+            title=('title', 'first'), session_end=('visit_time', 'last'), visit_count=('visit_time', 'size'))
+        domains = grouped.index
+        self.open.loc[domains, 'session_end'] = grouped['session_end']
+        self.open.loc[domains, 'visit_count'] += grouped['visit_count']
+        untitled = self.open.loc[domains, 'title'].eq('Untitled') & grouped['title'].notna()
+        self.open.loc[untitled[untitled].index, 'title'] = grouped.loc[untitled, 'title']
+
+    #all sessions, in the same order split_sessions would give for the whole history at once
+    def result(self):
+        columns = ['domain', 'title', 'url', 'session_start', 'session_end', 'visit_count']
+        if self.open is None:
+            return pd.DataFrame(columns=columns)
+        frames = [f for f in self.closed if not f.empty]
+        last = self.open.reset_index()
+        sessions = pd.concat(frames + [last], ignore_index=True) if frames else last
+        sessions['is_last'] = np.r_[np.zeros(len(sessions) - len(last), dtype=bool), np.ones(len(last), dtype=bool)]
+        sessions = sessions.sort_values(['is_last', 'domain', 'session_start'], kind='stable')
+        return sessions.reset_index(drop=True)[columns]
+
+#load, filter, add domains, convert times and sessionize a history chunk by chunk
+#returns (visits, sessions); with keep_visits=False only the sessions are kept, so memory stays bounded by the chunk size
+#(sessionize=False skips sessions and returns None for them)
+#on_chunk(kept chunks, raw rows read so far) runs after every chunk; raising in it stops the load
+def load_history_streaming(db_path, browser, keywords, session_length=30, chunksize=STREAM_CHUNK_ROWS,
+                           cache=None, keep_visits=True, sessionize=True, on_chunk=None):
+    cache = cache if cache is not None else DomainCache()
+    convert = _time_converter(browser)
+    builder = SessionBuilder(session_length)
+    removed = {k: 0 for k in keywords}
+    kept = []
+    rows_read = 0
+    for chunk in iter_history_chunks(db_path, browser, chunksize):
+        rows_read += len(chunk)
+        with stage("keyword filter", rows_in=len(chunk)) as s:
+            matched, counts = keyword_filter_mask(chunk, keywords)
+            chunk = chunk[~matched.to_numpy()]
+            s.rows_out = len(chunk)
+        for keyword, count in counts.items():
+            removed[keyword] += count
+        with stage("add domain", rows_in=len(chunk)) as s:
+            chunk = add_domain_from_rev_host(chunk, cache) if "rev_host" in chunk else add_domain(chunk, cache)
+            s.rows_out = len(chunk)
+        with stage("convert times", rows_in=len(chunk)) as s:
+            chunk["visit_time"] = convert(chunk["visit_time"])
+            s.rows_out = len(chunk)
+        if sessionize:
+            with stage("sessionize", rows_in=len(chunk)):
+                builder.add(chunk)
+        if keep_visits:
+            kept.append(chunk)
+        if on_chunk is not None:
+            on_chunk(kept, rows_read)
+    keywords.update(removed)
+
+    visits = pd.concat(kept, ignore_index=True) if kept else pd.DataFrame(columns=["url", "title", "visit_time", "domain"])
+    return visits, builder.result() if sessionize else None
+
+# -------------------------------------------------------
+# Multi-file uploads (one worker process per History file)
+# -------------------------------------------------------
+
+INGEST_WORKERS = min(os.cpu_count() or 1, 8)
+
+#worker processes for multi-file uploads, shared by every session (spawned: the server process has threads)
+@st.cache_resource
+def get_ingest_pool():
+    return ProcessPoolExecutor(max_workers=INGEST_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+
+#dictionary-encode the string columns, so each distinct url/title/domain is pickled once between processes
+def compact_visits(visits):
+    return visits.astype({"url": "category", "title": "category", "domain": "category"})
+
+#load one History file in a worker: check it, then filter, add domains and convert times
+#returns (browser, compact visits, keywords with rows removed); ValueError carries a message for the user
+def ingest_history_file(source, keywords, pushdown=False):
+    try:
+        browser = history_browser(source)
+    except sqlite3.Error:
+        raise ValueError("Invalid SQLite database file")
+    if browser not in ("chrome", "safari", "firefox"):
+        raise ValueError("Unknown browser history database.")
+    keywords = dict(keywords)
+    if pushdown:
+        visits = load_history_pushdown(source, browser, keywords)
+    else:
+        visits, _ = load_history_streaming(source, browser, keywords, sessionize=False)
+    return browser, compact_visits(visits), keywords
+
+#run ingest_history_file for every source at once; one (result, error) pair per source, in order
+def ingest_history_files(sources, keywords, pushdown=False, pool=None):
+    pool = pool if pool is not None else get_ingest_pool()
+    futures = [pool.submit(ingest_history_file, source, keywords, pushdown) for source in sources]
+    results = []
+    for future in futures:
+        try:
+            results.append((future.result(), None))
+        except (ValueError, sqlite3.Error) as e:
+            results.append((None, str(e)))
+    return results
+
+#profile name per uploaded file: its name, numbered when files share one (every Chrome profile's file is 'History')
+def profile_names(names):
+    totals = Counter(names)
+    seen = Counter()
+    profiles = []
+    for name in names:
+        seen[name] += 1
+        profiles.append(f"{name} ({seen[name]})" if totals[name] > 1 else name)
+    return profiles
+
+#one visit table from several files' visits with a 'profile' column, oldest first (equal times keep file order)
+def merge_profiles(frames, profiles):
+    columns = {}
+    for col in ("url", "title", "domain"):
+        #one category dtype for every file (an empty file or one without titles has object categories)
+        parts = [pd.Categorical(f[col]) for f in frames]
+        parts = [pd.Categorical.from_codes(c.codes, categories=c.categories.astype("str")) for c in parts]
+        columns[col] = union_categoricals(parts, ignore_order=True)
+    columns["visit_time"] = pd.concat([f["visit_time"] for f in frames], ignore_index=True)
+    codes = np.repeat(np.arange(len(frames)), [len(f) for f in frames])
+    columns["profile"] = pd.Categorical.from_codes(codes, categories=profiles)
+    merged = pd.DataFrame(columns)
+    return merged.sort_values("visit_time", kind="stable", na_position="last").reset_index(drop=True)
+
+# -----------------------------------------------------------
+# Background uploads (partial results while the file is read)
+# -----------------------------------------------------------
+
+BACKGROUND_MIN_BYTES = 50_000_000   #smaller History files are read in the script run itself
+PARTIAL_GROWTH = 4                  #publish a partial store whenever the kept visits have grown this many times
+INGEST_POLL_S = 1                   #how often pages check a running upload
+
+#rows the streaming reader will yield for a history db (the denominator of upload progress)
+def count_history_rows(db_path, browser):
+    conn = connect_history_db(db_path)
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM ({_history_query(conn, browser)})").fetchone()[0]
+    finally:
+        conn.close()
+
+class IngestCancelled(Exception):
+    pass
+
+#one streaming upload on a background thread; scripts poll snapshot() for its progress and its latest HistoryStore
+#partial stores hold the oldest visits read so far (files are read oldest first), the last one holds every visit
+class IngestJob:
+    def __init__(self, lease, cache_key, keywords, session_length=30, cache=None, profiler=None):
+        self.lease = lease          #context manager giving the db source (e.g. UploadStore.lease)
+        self.cache_key = cache_key
+        self.keywords = dict(keywords)
+        self.session_length = session_length
+        self.cache = cache          #DomainCache used only by this job's thread
+        self.profiler = profiler    #the thread's own StageProfiler (profilers aren't shared between threads)
+        self.lock = threading.Lock()
+        self.browser = None
+        self.stage = "starting"
+        self.rows_read = 0
+        self.rows_total = None
+        self.store = None
+        self.version = 0            #bumped whenever store is replaced
+        self.done = False
+        self.error = None
+        self._cancelled = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="history-ingest", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    #stop after the chunk being read (the file's lease is released on the way out)
+    def cancel(self):
+        self._cancelled.set()
+
+    def snapshot(self):
+        with self.lock:
+            return {"browser": self.browser, "stage": self.stage, "rows_read": self.rows_read,
+                    "rows_total": self.rows_total, "store": self.store, "version": self.version,
+                    "done": self.done, "error": self.error}
+
+    def _update(self, **fields):
+        with self.lock:
+            for name, value in fields.items():
+                setattr(self, name, value)
+            if "store" in fields:
+                self.version += 1
+
+    def _run(self):
+        try:
+            with profile_stages(self.profiler), self.lease as source:
+                self._ingest(source)
+        except IngestCancelled:
+            pass
+        except (ValueError, sqlite3.Error) as e:
+            self._update(error=str(e), done=True)
+        except Exception as e:
+            self._update(error=f"Unable to read the file. Error: {e}", done=True)
+
+    def _ingest(self, source):
+        with stage("check file"):
+            try:
+                browser = history_browser(source)
+            except sqlite3.Error:
+                raise ValueError("Invalid SQLite database file")
+        if browser not in ("chrome", "safari", "firefox"):
+            raise ValueError("Unknown browser history database.")
+        with stage("count visits"):
+            total = count_history_rows(source, browser)
+        self._update(browser=browser, rows_total=total, stage="reading")
+        published = 0
+
+        def on_chunk(kept, rows_read):
+            nonlocal published
+            if self._cancelled.is_set():
+                raise IngestCancelled()
+            self._update(rows_read=rows_read)
+            rows = sum(len(chunk) for chunk in kept)
+            if rows and rows >= PARTIAL_GROWTH * published and rows_read < total:
+                with stage("partial HistoryStore", rows_in=rows) as s:
+                    partial = HistoryStore(pd.concat(kept, ignore_index=True), self.session_length)
+                    s.rows_out = partial.n_sessions
+                self._update(store=partial)
+                published = rows
+
+        with stage("load (streaming)") as s:
+            visits, _ = load_history_streaming(source, browser, self.keywords, self.session_length, cache=self.cache,
+                                               sessionize=False, on_chunk=on_chunk)
+            s.rows_out = len(visits)
+        if visits.empty:
+            raise ValueError("There is no browsing data in this file.")
+        self._update(stage="sessionizing")
+        with stage("build HistoryStore", rows_in=len(visits)) as s:
+            store = HistoryStore(visits, self.session_length)
+            s.rows_out = store.n_sessions
+        if store.n_sessions == 0:
+            raise ValueError("No browsing sessions could be created from your data")
+        self._update(store=store, stage="done", done=True)
+
+#every page: take over the newest store of this session's running upload and show how far it has got
+#(keywords are applied again to each new store; the finished store goes into the shared upload cache)
+def follow_ingest():
+    job = st.session_state.get('ingest')
+    if job is None:
+        return
+    snapshot = job.snapshot()
+    if snapshot["error"] is not None:
+        del st.session_state.ingest
+        st.session_state.pop('upload_key', None)
+        st.session_state.pop('history', None)
+        st.error(snapshot["error"])
+        return
+    if snapshot["store"] is not None and st.session_state.get('ingest_version') != snapshot["version"]:
+        st.session_state.history = HistoryView(snapshot["store"], st.session_state.get('keywords', {}))
+        st.session_state.browser = snapshot["browser"]
+        st.session_state.ingest_version = snapshot["version"]
+    if snapshot["done"]:
+        store = snapshot["store"]
+        get_history_cache().put(job.cache_key, (snapshot["browser"], store, job.keywords), store.nbytes(),
+                                st.session_state.upload_owner)
+        if job.profiler is not None and job.profiler.records:
+            st.session_state.performance = job.profiler
+        del st.session_state.ingest
+        return
+    _ingest_progress()
+
+#progress bar of the running upload, redrawn every INGEST_POLL_S; the whole page reruns when there's a newer store
+@st.fragment(run_every=INGEST_POLL_S)
+def _ingest_progress():
+    job = st.session_state.get('ingest')
+    if job is None:
+        return
+    snapshot = job.snapshot()
+    if snapshot["done"] or snapshot["version"] != st.session_state.get('ingest_version'):
+        st.rerun(scope="app")
+    if snapshot["stage"] == "reading" and snapshot["rows_total"]:
+        st.progress(min(snapshot["rows_read"] / snapshot["rows_total"], 1.0),
+                    text=f"Reading your history: {snapshot['rows_read']:,} of {snapshot['rows_total']:,} visits")
+    elif snapshot["stage"] == "sessionizing":
+        st.progress(1.0, text=f"Building browsing sessions from {snapshot['rows_read']:,} visits")
+    else:
+        st.progress(0.0, text="Opening your history file")
+    if snapshot["store"] is not None:
+        last = HistoryStore._datetimes(snapshot["store"].visit_time.max(keepdims=True))[0]
+        st.caption(f"Showing your history up to {last:%b %d, %Y} for now. The results fill in as the rest is read.")
+
+# ------------------------------------------
+# Activity cube (visits per date x hour)
+# ------------------------------------------
+
+NS_PER_HOUR = 3_600 * 10**9
+NAT_NS = np.iinfo(np.int64).min #NaT as int64 nanoseconds
+HEATMAP_MAX_MARKS = 5_000   #rects per heatmap before switching to week, then month columns
+
+#dense (day, hour of day) visit counts from the first to the last day with visits (UTC)
+#built once from int64 epoch ns; the heatmap and activity metrics read this instead of visit rows
+class ActivityCube:
+    def __init__(self, visit_time=None, day0=0, counts=None):
+        if counts is None:
+            hours = visit_time[visit_time != NAT_NS] // NS_PER_HOUR
+            day0 = int(hours.min() // 24) if len(hours) else 0
+            n_days = int(hours.max() // 24) - day0 + 1 if len(hours) else 0
+            counts = np.bincount(hours - day0 * 24, minlength=n_days * 24).reshape(n_days, 24)
+        self.day0 = day0    #days since 1970-01-01 of the first row
+        self.counts = counts
+        self._frames = {}   #period -> to_frame result (the cube never changes, so neither do these)
+
+    #new cube with [added] visits counted and [removed] visits uncounted (both inside this cube's days)
+    def updated(self, added, removed):
+        counts = self.counts.ravel().copy()
+        for times, sign in ((added, 1), (removed, -1)):
+            hours = times[times != NAT_NS] // NS_PER_HOUR - self.day0 * 24
+            counts += sign * np.bincount(hours, minlength=counts.size)
+        return ActivityCube(day0=self.day0, counts=counts.reshape(self.counts.shape))
+
+    def total(self):
+        return int(self.counts.sum())
+
+    #visits per hour of day (0-23) over all days
+    def hourly(self):
+        return self.counts.sum(axis=0)
+
+    #(period start dates, counts per period x hour) for 'day', 'week' (starting Monday) or 'month'
+    def rollup(self, period='day'):
+        dates = np.arange(self.day0, self.day0 + len(self.counts)).astype('datetime64[D]')
+        if period == 'day' or not len(dates):
+            return dates, self.counts
+        if period == 'week':
+            lead = (self.day0 + 3) % 7 #days since monday (1970-01-01 was a thursday)
+            trail = -(lead + len(dates)) % 7
+            padded = np.pad(self.counts, ((lead, trail), (0, 0)))
+            return (dates[0] - lead) + np.arange(0, len(padded), 7), padded.reshape(-1, 7, 24).sum(axis=1)
+        if period == 'month':
+            months = dates.astype('datetime64[M]')
+            starts = np.flatnonzero(np.r_[True, months[1:] != months[:-1]])
+            return months[starts].astype('datetime64[D]'), np.add.reduceat(self.counts, starts, axis=0)
+        raise ValueError(f"Unknown period: {period}")
+
+    #long table (date, date_str, hour, visit_count) for the periods with any visits
+    #memoized: reruns hand streamlit the same frame, so its content-hashed chart data isn't sent again
+    def to_frame(self, period='day'):
+        if period not in self._frames:
+            dates, counts = self.rollup(period)
+            active = counts.sum(axis=1) > 0
+            dates, counts = dates[active], counts[active]
+            self._frames[period] = pd.DataFrame({
+                'date': np.repeat(dates, 24),
+                'date_str': np.repeat(np.datetime_as_string(dates, unit='M' if period == 'month' else 'D'), 24),
+                'hour': np.tile(np.arange(24), len(dates)),
+                'visit_count': counts.ravel(),
+            })
+        return self._frames[period]
+
+    #finest period whose heatmap fits in [max_marks] rects -> (period, to_frame(period))
+    def heatmap_frame(self, max_marks=HEATMAP_MAX_MARKS):
+        for period in ('day', 'week'):
+            dates, counts = self.rollup(period)
+            if np.count_nonzero(counts.sum(axis=1)) * 24 <= max_marks:
+                return period, self.to_frame(period)
+        return 'month', self.to_frame('month')
+
+# -----------------------------------------
+# Search words (word cloud frequencies)
+# -----------------------------------------
+
+_SEARCH_WORD = re.compile(r"\w[\w']*")   #WordCloud's default token pattern
+_SEARCH_STOPWORDS = {w.lower() for w in STOPWORDS}
+
+#words of one search query, tokenized like WordCloud.process_text ('s, numbers and stopwords removed)
+def query_words(query):
+    words = _SEARCH_WORD.findall(query)
+    words = [w[:-2] if w.lower().endswith("'s") else w for w in words]
+    return [w for w in words if not w.isdigit() and w.lower() not in _SEARCH_STOPWORDS]
+
+#search words of each distinct query, so word totals for any set of visits are sums of per-query counters
+class SearchWordIndex:
+    def __init__(self, queries):
+        self.words = [Counter(query_words(query)) for query in queries]
+
+    #(word totals, number of search visits) after adding visits with [added] query codes and removing [removed]
+    def updated(self, counts, n_searches, added=None, removed=None):
+        counts = Counter(counts)
+        for codes, sign in ((added, 1), (removed, -1)):
+            if codes is None:
+                continue
+            codes = codes[codes >= 0]   #-1: not a search
+            n_searches += sign * len(codes)
+            for code, n in zip(*np.unique(codes, return_counts=True)):
+                for word, k in self.words[code].items():
+                    counts[word] += sign * n * k
+        return +counts, n_searches   #+ drops words whose count fell to 0
+
+#word cloud frequencies: each word under its most common case, plurals merged into the singular
+#(WordCloud's process_tokens, on counts instead of a token list)
+def word_frequencies(counts):
+    cases = defaultdict(dict)
+    for word, n in counts.items():
+        cases[word.lower()][word] = n
+    for key in list(cases):
+        if key.endswith('s') and not key.endswith('ss') and key[:-1] in cases:
+            singular = cases[key[:-1]]
+            for word, n in cases.pop(key).items():
+                singular[word[:-1]] = singular.get(word[:-1], 0) + n
+    return {max(case.items(), key=lambda item: item[1])[0]: sum(case.values()) for case in cases.values()}
+
+#stable digest of a frequency dict (cache key for the rendered word cloud)
+def frequency_digest(frequencies):
+    return hashlib.sha1(repr(sorted(frequencies.items())).encode()).hexdigest()
+
+# ---------------------------------------
+# Full-text index (titles and url words)
+# ---------------------------------------
+
+#words of a url or title: maximal runs of letters and digits, upper-cased like str.contains(case=False) compares
+_TEXT_TOKEN = re.compile(r"[^\W_]+")
+
+def text_tokens(text):
+    return _TEXT_TOKEN.findall(text.upper())
+
+#word -> posting list over the distinct strings of some categorical columns (one id per category, column after column)
+#kept as three arrays: sorted vocabulary, where each word's postings start, and the posting ids themselves
+class TextIndex:
+    def __init__(self, *columns):
+        self.columns = columns
+        self.offsets = np.cumsum([0] + [len(col.categories) for col in columns])
+        texts = [text if isinstance(text, str) else "" for col in columns for text in col.categories]
+        words = [set(text_tokens(text)) for text in texts]
+        #ids of non-ascii strings: case-insensitive matching of those depends on the string backend, so they're rechecked
+        self.non_ascii = np.flatnonzero([not text.isascii() for text in texts])
+        lengths = np.fromiter(map(len, words), dtype=np.int64, count=len(words))
+        ids = np.repeat(np.arange(len(words), dtype=np.int32), lengths)
+        codes, vocab = pd.factorize(pd.Series([w for ws in words for w in ws], dtype=object), sort=True)
+        self.vocab = np.asarray(vocab, dtype=object)
+        self.postings = ids[np.argsort(codes, kind='stable')]    #grouped by word, ids ascending within a word
+        self.starts = np.r_[0, np.cumsum(np.bincount(codes, minlength=len(vocab)))]
+
+    def __len__(self):
+        return len(self.vocab)
+
+    #ids posted under the words in [words] (bool per vocabulary word) -> per column hit arrays (last entry: code -1)
+    def _hits(self, words):
+        hit = np.zeros(self.offsets[-1], dtype=bool)
+        hit[self.postings[np.repeat(words, np.diff(self.starts))]] = True
+        return [np.append(hit[a:b], False) for a, b in zip(self.offsets[:-1], self.offsets[1:])]
+
+    #per column hit arrays for every word starting with [prefix] (a contiguous range of the sorted vocabulary)
+    def prefix_hits(self, prefix):
+        lo, hi = np.searchsorted(self.vocab, [prefix, prefix + "\U0010ffff"])
+        words = np.zeros(len(self.vocab), dtype=bool)
+        words[lo:hi] = True
+        return self._hits(words)
+
+    #per column hit arrays for strings containing [keyword], or None when it isn't a single ascii word
+    #(an ascii word only ever occurs inside one token, so scanning the vocabulary finds every string holding it)
+    def substring_hits(self, keyword):
+        if not keyword.isascii() or not _TEXT_TOKEN.fullmatch(keyword):
+            return None
+        words = pd.Series(self.vocab, dtype=object).str.contains(keyword.upper(), regex=False).to_numpy(dtype=bool)
+        hits = self._hits(words)
+        for col, hit, a, b in zip(self.columns, hits, self.offsets[:-1], self.offsets[1:]):
+            ids = self.non_ascii[(self.non_ascii >= a) & (self.non_ascii < b)] - a
+            hit[ids] = np.asarray(col.categories[ids].str.contains(keyword, case=False, regex=False), dtype=bool)
+        return hits
+
+    #rows (given by their codes in each column) where every word of [query] starts a word of some column;
+    #None when the query has no words
+    def search(self, query, *codes):
+        mask = None
+        for term in dict.fromkeys(text_tokens(query)):
+            found = np.zeros(len(codes[0]), dtype=bool)
+            for hit, col_codes in zip(self.prefix_hits(term), codes):
+                found |= hit[col_codes]
+            mask = found if mask is None else mask & found
+        return mask
+
+    def nbytes(self):
+        return self.postings.nbytes + self.starts.nbytes + self.non_ascii.nbytes + \
+            int(pd.Series(self.vocab).memory_usage(deep=True))
+
+# -------------------------------------------
+# Compact history storage (dictionary-encoded)
+# -------------------------------------------
+
+#visits kept as int codes into one copy of each distinct url/title/domain plus int64 epoch times;
+#sessions are rows of visit positions. pages materialize the DataFrames they need on demand
+class HistoryStore:
+    def __init__(self, visits, session_length=30, sessions_at=None):
+        self.session_length = session_length
+        self.url = pd.Categorical(visits['url'])
+        self.title = pd.Categorical(visits['title'])
+        if 'Untitled' not in self.title.categories: #session title placeholder
+            self.title = self.title.add_categories(['Untitled'])
+        self.domain = pd.Categorical(visits['domain'])
+        self.profile = pd.Categorical(visits['profile']) if 'profile' in visits else None  #multi-file uploads only
+        self.visit_time = pd.to_datetime(visits['visit_time'], utc=True).to_numpy(dtype='datetime64[ns]').view('int64')
+        if sessions_at is not None:  #already sessionized (re-uploaded export)
+            self.sessions_at = sessions_at
+        else:
+            with stage("sessionize", rows_in=len(visits)) as s:
+                self.sessions_at = positions_to_arrays(session_positions(visits, session_length))
+                s.rows_out = self.n_sessions
+        with stage("activity cube", rows_in=len(visits)):
+            self.activity = ActivityCube(self.visit_time)
+        #search engine + query of each distinct url (urls are matched once, visits look them up by url code)
+        with stage("search queries", rows_in=len(self.url.categories)) as s:
+            engine, query = extract_search_queries(self.url.categories)
+            self.engine_of_url = pd.Categorical(np.append(engine, None), categories=list(SEARCH_ENGINES))
+            self.query_of_url = pd.Categorical(np.append(query, None))    #last entry: url code -1
+            self.search_index = SearchWordIndex(self.query_of_url.categories)
+            self.search_words, self.n_searches = self.search_index.updated(Counter(), 0, added=self.query_codes())
+            s.rows_out = self.n_searches
+        with stage("text index", rows_in=len(self.url.categories) + len(self.title.categories)) as s:
+            self.text_index = TextIndex(self.url, self.title)
+            s.rows_out = len(self.text_index)
+        self.time_order = np.argsort(self.visit_time, kind='stable') #visits in time order (stable for equal times)
+        self._timeline = None
+        self._domain_stats = None
+        self._frequencies = None
+        self._visit_table = None
+        self._session_table = None
+
+    def __len__(self):
+        return len(self.visit_time)
+
+    @property
+    def n_sessions(self):
+        return len(self.sessions_at['first'])
+
+    #int64 epoch ns -> datetime64[ns, UTC] without copying
+    @staticmethod
+    def _datetimes(nanos):
+        return pd.DatetimeIndex(nanos.view('datetime64[ns]')).tz_localize('UTC')
+
+    #categorical column sharing the store's categories
+    @staticmethod
+    def _column(categorical, codes):
+        return pd.Categorical.from_codes(codes, dtype=categorical.dtype, validate=False)
+
+    #visit table (url, title, visit_time, domain + is_search, engine, query [+ profile]) for all visits or the given positions
+    def visits(self, rows=None):
+        url_codes = self.url.codes if rows is None else self.url.codes[rows]
+        engine = self._column(self.engine_of_url, self.engine_of_url.codes[url_codes])
+        query = self._column(self.query_of_url, self.query_of_url.codes[url_codes])
+        if rows is None:
+            visits = pd.DataFrame({
+                'url': self.url,
+                'title': self.title,
+                'visit_time': self._datetimes(self.visit_time),
+                'domain': self.domain,
+                'is_search': engine.codes >= 0,
+                'engine': engine,
+                'query': query,
+            })
+        else:
+            visits = pd.DataFrame({
+                'url': self._column(self.url, url_codes),
+                'title': self._column(self.title, self.title.codes[rows]),
+                'visit_time': self._datetimes(self.visit_time[rows]),
+                'domain': self._column(self.domain, self.domain.codes[rows]),
+                'is_search': engine.codes >= 0,
+                'engine': engine,
+                'query': query,
+            })
+        if self.profile is not None:
+            visits['profile'] = self.profile if rows is None else self._column(self.profile, self.profile.codes[rows])
+        return visits
+
+    #session table (split_sessions columns + session_length) for session position arrays (default: all visits)
+    def sessions(self, sessions_at=None):
+        at = self.sessions_at if sessions_at is None else sessions_at
+        first = at['first']
+        untitled = self.title.categories.get_loc('Untitled')
+        title_codes = np.where(at['title'] >= 0, self.title.codes[np.maximum(at['title'], 0)], untitled)
+        start = self.visit_time[first]
+        end = self.visit_time[at['last']]
+        return pd.DataFrame({
+            'domain': self._column(self.domain, self.domain.codes[first]),
+            'title': self._column(self.title, title_codes),
+            'url': self._column(self.url, self.url.codes[first]),
+            'session_start': self._datetimes(start),
+            'session_end': self._datetimes(end),
+            'visit_count': at['visit_count'],
+            'session_length': pd.to_timedelta(end - start, unit='ns'),
+        })
+
+    #DomainStats for all visits' sessions, built on first use (the store never changes)
+    def domain_stats(self):
+        if self._domain_stats is None:
+            self._domain_stats = DomainStats(self, self.sessions_at)
+        return self._domain_stats
+
+    #SearchTimeline of all visits, made on first use
+    def search_timeline(self):
+        if self._timeline is None:
+            self._timeline = SearchTimeline(self, self.time_order)
+        return self._timeline
+
+    #TablePagers of all visits and sessions, made on first use (their sort orders are shared by every session)
+    def visit_table(self):
+        if self._visit_table is None:
+            self._visit_table = visit_table(self)
+        return self._visit_table
+
+    def session_table(self):
+        if self._session_table is None:
+            self._session_table = session_table(self, self.sessions_at)
+        return self._session_table
+
+    #query code (-1: not a search) of all visits or the given rows
+    def query_codes(self, rows=None):
+        url_codes = self.url.codes if rows is None else self.url.codes[rows]
+        return self.query_of_url.codes[url_codes]
+
+    #word cloud frequencies of all visits' searches, made on first use
+    def word_frequencies(self):
+        if self._frequencies is None:
+            self._frequencies = word_frequencies(self.search_words)
+        return self._frequencies
+
+    #visits whose url or title contains [keyword] (case-insensitive); single words are looked up in the text index,
+    #anything else checks each distinct string once
+    def keyword_mask(self, keyword):
+        hits = self.text_index.substring_hits(keyword)
+        if hits is None:
+            hits = [np.append(np.asarray(col.categories.str.contains(keyword, case=False, regex=False), dtype=bool), False)
+                    for col in (self.url, self.title)]
+        mask = np.zeros(len(self), dtype=bool)
+        for hit, col in zip(hits, (self.url, self.title)):
+            mask |= hit[col.codes] #code -1 (missing) never matches
+        return mask
+
+    #bytes held by the store (codes, distinct strings, times and time order, session positions and the activity cube)
+    def nbytes(self):
+        total = self.visit_time.nbytes + self.time_order.nbytes + self.activity.counts.nbytes
+        for col in (self.url, self.title, self.domain, self.engine_of_url, self.query_of_url, self.profile):
+            if col is not None:
+                total += col.codes.nbytes + col.categories.memory_usage(deep=True)
+        for arr in self.sessions_at.values():
+            total += arr.nbytes
+        return total + self.text_index.nbytes()
+
+#per-domain session counts for one set of sessions, sorted once (most sessions first, ties by domain)
+#top-N is a slice, and "how many domains have < t sessions" is a binary search on the ascending counts
+class DomainStats:
+    def __init__(self, store, sessions_at):
+        first = sessions_at['first']
+        per_domain = np.bincount(store.domain.codes[first], minlength=len(store.domain.categories))
+        order = np.lexsort((np.arange(len(per_domain)), -per_domain))
+        order = order[per_domain[order] > 0]
+        self.domains = store.domain.categories[order]
+        self.counts = per_domain[order]
+        self.cumulative = np.cumsum(self.counts)   #sessions in the top k domains = cumulative[k - 1]
+        self.ascending = self.counts[::-1]
+        self.n_sessions = len(first)
+        start, end = store.visit_time[first], store.visit_time[sessions_at['last']]
+        start, end = start[start != NAT_NS], end[end != NAT_NS]
+        self.first_start = pd.Timestamp(start.min(), tz='UTC') if len(start) else pd.NaT
+        self.last_end = pd.Timestamp(end.max(), tz='UTC') if len(end) else pd.NaT
+        self._table = None
+
+    def __len__(self):
+        return len(self.counts)
+
+    #(domain, total_sessions) for every domain, most visited first
+    def table(self):
+        if self._table is None:
+            self._table = pd.DataFrame({'domain': self.domains, 'total_sessions': self.counts})
+        return self._table
+
+    def top(self, n):
+        return self.table().head(n)
+
+    #top [n] domains plus one "Other" row holding every remaining domain's sessions
+    def top_with_other(self, n):
+        top = self.top(n)
+        rest = len(self) - len(top)
+        if rest <= 0:
+            return top
+        other = self.n_sessions - int(self.cumulative[len(top) - 1]) if len(top) else self.n_sessions
+        return pd.concat([top, pd.DataFrame({'domain': [f"Other ({rest:,} domains)"], 'total_sessions': [other]})],
+                         ignore_index=True)
+
+    #number of domains with fewer than [threshold] sessions
+    def count_below(self, threshold):
+        return int(np.searchsorted(self.ascending, threshold, side='left'))
+
+    #domains with fewer than [threshold] sessions (the tail of the table)
+    def below(self, threshold):
+        return self.table().iloc[len(self) - self.count_below(threshold):]
+
+#visits in time order plus the positions (in that order) of search visits
+#the k visits after a search are a slice of [order], so a page of N searches costs O(N*k) and never sorts
+class SearchTimeline:
+    def __init__(self, store, order):
+        self.store = store
+        self.order = order      #store rows, oldest visit first
+        self.searches = np.flatnonzero(store.query_codes(order) >= 0)
+
+    def __len__(self):
+        return len(self.searches)
+
+    #search numbers on [page] (0 = the most recent [per_page] searches), newest first
+    def page(self, page, per_page):
+        end = len(self) - page * per_page
+        return range(end - 1, max(end - per_page, 0) - 1, -1)
+
+    #(query, engine, visit_time) of search [i]
+    def search(self, i):
+        row = self.order[self.searches[i]]
+        url_code = self.store.url.codes[row]
+        return (self.store.query_of_url[url_code], self.store.engine_of_url[url_code],
+                self.store._datetimes(self.store.visit_time[row:row + 1])[0])
+
+    #the [k] visits after search [i] (fewer at the end of the history)
+    def following(self, i, k=10):
+        start = self.searches[i] + 1
+        visits = self.store.visits(self.order[start:start + k])
+        #plain strings: a categorical column would send every distinct url/title to the browser with these k rows
+        return visits.astype({'url': object, 'title': object, 'domain': object})
+
+#sort key per row of a categorical column: the category's rank in text order (missing values last)
+def _category_sort_key(categorical, codes):
+    rank = np.empty(len(categorical.categories), dtype=np.int64)
+    rank[np.argsort(np.asarray(categorical.categories, dtype=object), kind='stable')] = np.arange(len(rank))
+    return np.append(rank, len(rank))[codes]
+
+#rows whose category contains [text] (case-insensitive), matched once per distinct value
+def _category_contains(categorical, codes, text):
+    hit = np.asarray(categorical.categories.str.contains(text, case=False, regex=False, na=False), dtype=bool)
+    return np.append(hit, False)[codes]
+
+#a raw data table served one page at a time: sorting is an argsort per column (computed once, on first use),
+#domain/text filters narrow the sorted rows with a mask, and only the rows of one page are ever materialized
+class TablePager:
+    def __init__(self, store, keys, codes, frame, span):
+        self.store = store
+        self.keys = keys    #column -> function returning its sort key per row
+        self.codes = codes  #'domain', 'url', 'title' -> store category codes per row
+        self.frame = frame  #row numbers -> display frame
+        self.span = span    #(start column, end column) for the table's timeframe
+        self._orders = {}
+        self._rows = None   #(filters, rows) of the last request
+
+    def __len__(self):
+        return len(self.codes['domain'])
+
+    #row numbers sorted by [column], stable (ties keep table order)
+    def order(self, column):
+        if column not in self._orders:
+            self._orders[column] = np.argsort(self.keys[column](), kind='stable')
+        return self._orders[column]
+
+    #row numbers matching [domain] (part of the domain) and [search] (every word starts a url or title word),
+    #sorted by [column]
+    def rows(self, column, descending=False, domain="", search=""):
+        filters = (column, descending, domain.strip(), search.strip())
+        cached = self._rows     #shared by every session using the store: read once, and always return our own rows
+        if cached is not None and cached[0] == filters:
+            return cached[1]
+        rows = self.order(column)[::-1] if descending else self.order(column)
+        mask = None
+        if filters[2]:
+            mask = _category_contains(self.store.domain, self.codes['domain'], filters[2])
+        found = self.store.text_index.search(filters[3], self.codes['url'], self.codes['title'])
+        if found is not None:
+            mask = found if mask is None else mask & found
+        if mask is not None:
+            rows = rows[mask[rows]]
+        self._rows = (filters, rows)
+        return rows
+
+    #display frame for [rows] (plain strings: categoricals would send every distinct value with the page)
+    def page(self, rows):
+        frame = self.frame(rows)
+        return frame.astype({c: object for c in ('domain', 'title', 'url', 'profile') if c in frame})
+
+    #row count, distinct domains and first/last time of the whole table
+    def summary(self):
+        start, end = (self.keys[col]() for col in self.span)
+        start, end = start[start != NAT_NS], end[end != NAT_NS]
+        domains = self.codes['domain']
+        return {
+            'rows': len(self),
+            'domains': int(np.count_nonzero(np.bincount(domains[domains >= 0]))),
+            'start': self.store._datetimes(start.min(keepdims=True))[0] if len(start) else None,
+            'end': self.store._datetimes(end.max(keepdims=True))[0] if len(end) else None,
+        }
+
+#TablePager over visits at store positions [rows] (None: every visit)
+def visit_table(store, rows=None):
+    rows = np.arange(len(store)) if rows is None else rows
+    codes = {'domain': store.domain.codes[rows], 'url': store.url.codes[rows], 'title': store.title.codes[rows]}
+    keys = {
+        'domain': lambda: _category_sort_key(store.domain, codes['domain']),
+        'title': lambda: _category_sort_key(store.title, codes['title']),
+        'url': lambda: _category_sort_key(store.url, codes['url']),
+        'visit_time': lambda: store.visit_time[rows],
+    }
+    if store.profile is not None:
+        keys['profile'] = lambda: _category_sort_key(store.profile, store.profile.codes[rows])
+    return TablePager(store, keys, codes, lambda page: store.visits(rows[page]), ('visit_time', 'visit_time'))
+
+#TablePager over the sessions in [sessions_at]
+def session_table(store, sessions_at):
+    first, last = sessions_at['first'], sessions_at['last']
+    title_rows = np.maximum(sessions_at['title'], 0)
+    untitled = store.title.categories.get_loc('Untitled')
+    codes = {
+        'domain': store.domain.codes[first],
+        'url': store.url.codes[first],
+        'title': np.where(sessions_at['title'] >= 0, store.title.codes[title_rows], untitled),
+    }
+    keys = {
+        'domain': lambda: _category_sort_key(store.domain, codes['domain']),
+        'title': lambda: _category_sort_key(store.title, codes['title']),
+        'url': lambda: _category_sort_key(store.url, codes['url']),
+        'session_start': lambda: store.visit_time[first],
+        'session_end': lambda: store.visit_time[last],
+        'session_length': lambda: store.visit_time[last] - store.visit_time[first],
+        'visit_count': lambda: sessions_at['visit_count'],
+    }
+    return TablePager(store, keys, codes, lambda page: store.sessions({c: a[page] for c, a in sessions_at.items()}),
+                      ('session_start', 'session_end'))
+
+#session_positions frame -> dict of int arrays
+def positions_to_arrays(positions):
+    return {col: positions[col].to_numpy(dtype=np.int64) for col in ['first', 'last', 'title', 'visit_count']}
+
+#one session's keyword-filtered view of a (shared, read-only) HistoryStore
+#keyword edits only touch the rows that change, and sessions are recomputed only for their domains
+class HistoryView:
+    def __init__(self, store, keywords=()):
+        self.store = store
+        self.masks = {}     #keyword -> rows containing it
+        self.match_count = np.zeros(len(store), dtype=np.int16)    #keywords matching each row (kept if 0)
+        self.sessions_at = store.sessions_at
+        self.activity = store.activity  #replaced (never modified) when kept visits change
+        self.search_words, self.n_searches = store.search_words, store.n_searches
+        self._domain_stats = None   #(sessions_at it was built from, DomainStats)
+        self._frequencies = None    #(search_words it was built from, word_frequencies)
+        self._timeline = None       #(sessions_at it was built from, SearchTimeline)
+        self._tables = None         #(sessions_at they were built from, visit TablePager, session TablePager)
+        self.set_keywords(keywords)
+
+    def __len__(self):
+        return int(np.count_nonzero(self.match_count == 0))
+
+    @property
+    def n_sessions(self):
+        return len(self.sessions_at['first'])
+
+    #rows containing each keyword (rows with several keywords count for each)
+    def removed_counts(self):
+        return {k: int(mask.sum()) for k, mask in self.masks.items()}
+
+    def set_keywords(self, keywords):
+        keywords = {k for k in keywords if k}
+        added = [k for k in keywords if k not in self.masks]
+        removed = [k for k in self.masks if k not in keywords]
+        if not added and not removed:
+            return
+        before = self.match_count == 0
+        for keyword in removed:
+            self.match_count -= self.masks.pop(keyword)
+        with stage("keyword masks", rows_in=len(self.store)):
+            for keyword in added:
+                self.masks[keyword] = self.store.keyword_mask(keyword)
+                self.match_count += self.masks[keyword]
+        changed = before != (self.match_count == 0)
+        if not self.masks:  #every visit kept again: reuse the unfiltered sessions and counts
+            self.sessions_at = self.store.sessions_at
+            self.activity = self.store.activity
+            self.search_words, self.n_searches = self.store.search_words, self.store.n_searches
+        elif changed.any():
+            with stage("resessionize changed domains", rows_in=int(changed.sum())) as s:
+                self._resessionize(np.unique(self.store.domain.codes[changed]))
+                s.rows_out = self.n_sessions
+            rows = np.flatnonzero(changed)
+            kept = self.match_count[rows] == 0
+            times = self.store.visit_time
+            self.activity = self.activity.updated(times[rows[kept]], times[rows[~kept]])
+            self.search_words, self.n_searches = self.store.search_index.updated(
+                self.search_words, self.n_searches,
+                added=self.store.query_codes(rows[kept]), removed=self.store.query_codes(rows[~kept]))
+
+    #recompute sessions for [domains] (codes) from their kept visits, keep every other domain's sessions
+    def _resessionize(self, domains):
+        codes = self.store.domain.codes
+        rows = np.flatnonzero(np.isin(codes, domains) & (self.match_count == 0))
+        fresh = positions_to_arrays(session_positions(self.store.visits(rows), self.store.session_length))
+        fresh = {col: rows[arr] if col in ('first', 'last') else arr for col, arr in fresh.items()}
+        fresh['title'] = np.where(fresh['title'] >= 0, rows[np.maximum(fresh['title'], 0)], -1)
+
+        untouched = ~np.isin(codes[self.sessions_at['first']], domains)
+        merged = {col: np.r_[self.sessions_at[col][untouched], fresh[col]] for col in fresh}
+
+        #split_sessions order: finished sessions by (domain, start), then each domain's last session by domain
+        domain = codes[merged['first']]
+        start = self.store.visit_time[merged['first']]
+        by_domain = np.lexsort((start, domain))
+        is_last = np.r_[domain[by_domain][1:] != domain[by_domain][:-1], True]
+        order = by_domain[np.argsort(is_last, kind='stable')]
+        self.sessions_at = {col: arr[order] for col, arr in merged.items()}
+
+    #store positions of the kept visits (None: all of them)
+    def kept_rows(self):
+        return np.flatnonzero(self.match_count == 0) if self.masks else None
+
+    def visits(self):
+        return self.store.visits(self.kept_rows())
+
+    def sessions(self):
+        return self.store.sessions(self.sessions_at)
+
+    #DomainStats for the kept sessions, rebuilt only after keyword changes replace sessions_at
+    def domain_stats(self):
+        if self.sessions_at is self.store.sessions_at:
+            return self.store.domain_stats()
+        if self._domain_stats is None or self._domain_stats[0] is not self.sessions_at:
+            self._domain_stats = (self.sessions_at, DomainStats(self.store, self.sessions_at))
+        return self._domain_stats[1]
+
+    #SearchTimeline of the kept visits (the store's time order without removed rows), rebuilt after keyword changes
+    def search_timeline(self):
+        if self.sessions_at is self.store.sessions_at:
+            return self.store.search_timeline()
+        if self._timeline is None or self._timeline[0] is not self.sessions_at:
+            order = self.store.time_order
+            self._timeline = (self.sessions_at, SearchTimeline(self.store, order[self.match_count[order] == 0]))
+        return self._timeline[1]
+
+    #TablePagers of the kept visits and sessions, rebuilt only after keyword changes
+    def visit_table(self):
+        if self.sessions_at is self.store.sessions_at:
+            return self.store.visit_table()
+        return self._kept_tables()[0]
+
+    def session_table(self):
+        if self.sessions_at is self.store.sessions_at:
+            return self.store.session_table()
+        return self._kept_tables()[1]
+
+    def _kept_tables(self):
+        if self._tables is None or self._tables[0] is not self.sessions_at:
+            self._tables = (self.sessions_at, visit_table(self.store, self.kept_rows()),
+                            session_table(self.store, self.sessions_at))
+        return self._tables[1:]
+
+    #word cloud frequencies of the kept searches, rebuilt only after keyword changes
+    def word_frequencies(self):
+        if self.search_words is self.store.search_words:
+            return self.store.word_frequencies()
+        if self._frequencies is None or self._frequencies[0] is not self.search_words:
+            self._frequencies = (self.search_words, word_frequencies(self.search_words))
+        return self._frequencies[1]
+
+    def nbytes(self):
+        return self.match_count.nbytes + sum(m.nbytes for m in self.masks.values()) + \
+            sum(arr.nbytes for arr in self.sessions_at.values()) + self.activity.counts.nbytes
+
+# ----------------------------------------------------
+# Parquet export (re-uploading it skips load + sessions)
+# ----------------------------------------------------
+
+EXPORT_METADATA_KEY = b"browsing_history"
+EXPORT_VERSION = 1
+EXPORT_COLUMNS = ['url', 'title', 'visit_time', 'domain', 'profile']
+
+#session index (in sessions_at order) of each of [rows]' visits, -1 for visits without a time
+#sessions are runs of a domain's visits in time order, each starting at a session's first visit
+def visit_sessions(store, sessions_at, rows):
+    session = np.full(len(rows), -1, dtype=np.int64)
+    timed = np.flatnonzero(store.visit_time[rows] != NAT_NS)
+    if not timed.size:
+        return session
+    order = timed[np.lexsort((store.visit_time[rows[timed]], store.domain.codes[rows[timed]]))]
+    session_of_first = np.full(len(store), -1, dtype=np.int64)
+    session_of_first[sessions_at['first']] = np.arange(len(sessions_at['first']))
+    starts = session_of_first[rows[order]]
+    is_start = starts >= 0
+    session[order] = starts[is_start][np.cumsum(is_start) - 1]
+    return session
+
+#[df] with categorical columns cut down to the values its rows use (a store's categoricals carry every distinct
+#url/title/domain, including those of visits removed by keywords, and parquet would write them all)
+def _used_categories(df):
+    return df.apply(lambda col: col.cat.remove_unused_categories() if isinstance(col.dtype, pd.CategoricalDtype) else col)
+
+#the kept visits of a HistoryView as zstd parquet bytes, with each visit's session and the visit that titles it
+def export_visits_parquet(view, browser="unknown"):
+    store = view.store
+    rows = view.kept_rows()
+    rows = np.arange(len(store)) if rows is None else rows
+    visits = store.visits(rows)
+    visits = visits[[c for c in EXPORT_COLUMNS if c in visits]]
+    visits['session'] = visit_sessions(store, view.sessions_at, rows)
+    is_title = np.zeros(len(store), dtype=bool)
+    is_title[view.sessions_at['title'][view.sessions_at['title'] >= 0]] = True
+    visits['session_title'] = is_title[rows]
+
+    meta = {"version": EXPORT_VERSION, "browser": browser, "session_length": store.session_length}
+    table = pa.Table.from_pandas(_used_categories(visits), preserve_index=False)
+    table = table.replace_schema_metadata({**table.schema.metadata, EXPORT_METADATA_KEY: json.dumps(meta).encode()})
+    sink = pa.BufferOutputStream()
+    pq.write_table(table, sink, compression="zstd")
+    return sink.getvalue().to_pybytes()
+
+#the kept sessions of a HistoryView as zstd parquet bytes (for analysis elsewhere; can't be re-uploaded)
+def export_sessions_parquet(view):
+    sink = pa.BufferOutputStream()
+    pq.write_table(pa.Table.from_pandas(_used_categories(view.sessions()), preserve_index=False), sink, compression="zstd")
+    return sink.getvalue().to_pybytes()
+
+#true if an uploaded file is a parquet file (exports are; History databases start with "SQLite format 3")
+def is_parquet_upload(uploaded_file):
+    uploaded_file.seek(0)
+    magic = uploaded_file.read(4)
+    uploaded_file.seek(0)
+    return magic == b"PAR1"
+
+#sessions_at rebuilt from an export's session / session_title columns
+def _sessions_from_export(visits):
+    session = visits['session'].to_numpy(dtype=np.int64)
+    rows = np.flatnonzero(session >= 0)
+    times = pd.to_datetime(visits['visit_time'], utc=True).to_numpy(dtype='datetime64[ns]').view('int64')
+    order = rows[np.lexsort((times[rows], session[rows]))]
+    if not order.size:
+        return {col: np.array([], dtype=np.int64) for col in ['first', 'last', 'title', 'visit_count']}
+    starts = np.r_[0, np.flatnonzero(np.diff(session[order])) + 1]
+    ends = np.r_[starts[1:], len(order)] - 1
+    if not np.array_equal(session[order[starts]], np.arange(len(starts))):
+        raise ValueError("The export's sessions are not numbered 0, 1, 2, ...")
+    title = np.full(len(starts), -1, dtype=np.int64)
+    titled = rows[visits['session_title'].to_numpy(dtype=bool)[rows]]
+    title[session[titled]] = titled
+    return {'first': order[starts], 'last': order[ends], 'title': title, 'visit_count': ends - starts + 1}
+
+#(visits, sessions_at, metadata) from a file made by export_visits_parquet; ValueError if it isn't one
+def read_history_export(source):
+    try:
+        table = pq.read_table(source)
+    except (pa.ArrowInvalid, OSError) as e:
+        raise ValueError(f"Unreadable parquet file ({e})")
+    meta = (table.schema.metadata or {}).get(EXPORT_METADATA_KEY)
+    if meta is None or not {'url', 'title', 'visit_time', 'domain', 'session', 'session_title'} <= set(table.column_names):
+        raise ValueError("This parquet file wasn't exported from this app.")
+    meta = json.loads(meta)
+    if meta.get("version") != EXPORT_VERSION:
+        raise ValueError(f"Unsupported export version: {meta.get('version')}")
+    visits = table.to_pandas()
+    sessions_at = _sessions_from_export(visits)
+    return visits[[c for c in EXPORT_COLUMNS if c in visits]], sessions_at, meta
+
+# ---------------------------------------------
+# Upload cache (process-wide, keyed by content)
+# ---------------------------------------------
+
+HISTORY_CACHE_BYTES = 512 * 1024 * 1024 #budget for all cached histories
+HISTORY_CACHE_TTL_S = 60 * 60   #histories no session has used for an hour are dropped
+
+#sha256 of an uploaded file, read in fixed-size blocks
+def file_digest(uploaded_file):
+    uploaded_file.seek(0)
+    digest = hashlib.sha256()
+    for block in iter(lambda: uploaded_file.read(COPY_BLOCK_BYTES), b""):
+        digest.update(block)
+    uploaded_file.seek(0)
+    return digest.hexdigest()
+
+#cache key: same bytes, same keyword set and same session length give the same history
+#(keywords only go in hashed, so the cache never holds them as text)
+def history_cache_key(digest, keywords, session_length=30):
+    keyword_digest = hashlib.sha256("\n".join(sorted(keywords)).encode()).hexdigest()
+    return (digest, keyword_digest, session_length)
+
+#bounded LRU of processed histories, evicting least recently used entries past a byte budget
+#an entry lives only as long as a session using it (its UploadOwner) does, and at most ttl_s after its last use
+class HistoryCache:
+    def __init__(self, max_bytes=HISTORY_CACHE_BYTES, ttl_s=HISTORY_CACHE_TTL_S):
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self.entries = OrderedDict() #key -> (value, nbytes, last used)
+        self.owners = {}    #key -> ids of the sessions using it
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+        self.released = 0
+        self.lock = threading.Lock() #shared by every session's script thread
+
+    #[owner] is the session's UploadOwner
+    def get(self, key, owner):
+        with self.lock:
+            self._sweep()
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.entries[key] = (entry[0], entry[1], time.monotonic())
+            self.entries.move_to_end(key)
+            self._claim(key, owner)
+            return entry[0]
+
+    def put(self, key, value, nbytes, owner):
+        with self.lock:
+            self._sweep()
+            if nbytes > self.max_bytes: #would evict everything else and still not fit
+                return
+            if key in self.entries:
+                self.nbytes -= self.entries.pop(key)[1]
+            self.entries[key] = (value, nbytes, time.monotonic())
+            self.nbytes += nbytes
+            self._claim(key, owner)
+            while self.nbytes > self.max_bytes:
+                self._drop(next(iter(self.entries)))
+                self.evictions += 1
+
+    #a session ended: drop its entries nobody else uses
+    def release(self, key, owner_id):
+        with self.lock:
+            owners = self.owners.get(key)
+            if owners is None:
+                return
+            owners.discard(owner_id)
+            if not owners and key in self.entries:
+                self._drop(key)
+                self.released += 1
+
+    def _claim(self, key, owner):
+        owners = self.owners.setdefault(key, set())
+        if id(owner) not in owners:
+            owners.add(id(owner))
+            weakref.finalize(owner, self.release, key, id(owner))
+
+    #drop entries not used for ttl_s (least recently used come first)
+    def _sweep(self):
+        cutoff = time.monotonic() - self.ttl_s
+        while self.entries and next(iter(self.entries.values()))[2] < cutoff:
+            self._drop(next(iter(self.entries)))
+            self.expired += 1
+
+    def _drop(self, key):
+        self.nbytes -= self.entries.pop(key)[1]
+        self.owners.pop(key, None)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "bytes": self.nbytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expired": self.expired,
+                "released": self.released,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
             }
-    all_sessions.extend(current_sessions.values()) #add all leftover sessions
-    return pd.DataFrame(all_sessions)       
+
+#one cache for the whole server process
+@st.cache_resource
+def get_history_cache():
+    return HistoryCache()
 
 #add column w/ length of session
 def add_session_length(df):
@@ -0,0 +1,62 @@
+import argparse
+import hashlib
+import json
+import sys
+from pathlib import Path
+
+import altair as alt
+import pyarrow as pa
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app_functions import HEATMAP_MAX_MARKS, HistoryStore, add_domain, chrome_column_to_datetime
+from measure import timed
+from bench_heatmap import from_visits
+from synthetic import make_visits
+
+# ------------------------------------------------------------------------
+# Benchmark: chart payloads (rects, inline JSON, Arrow) before/after LOD
+# ------------------------------------------------------------------------
+
+#bytes streamlit sends for a chart's data (Arrow IPC stream), and its content hash
+def arrow_payload(df):
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    data = sink.getvalue().to_pybytes()
+    return len(data), hashlib.md5(data).hexdigest()
+
+#bytes of the same chart with its data inlined as JSON values (altair's default transformer)
+def json_payload(df):
+    chart = alt.Chart(df).mark_rect().encode(x='date_str:N', y='hour:O', color='visit_count:Q')
+    with alt.data_transformers.disable_max_rows():
+        return len(json.dumps(chart.to_dict()))
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare heatmap chart payloads with and without level of detail.")
+    parser.add_argument("--visits", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, nargs="+", default=[90, 365, 3 * 365])
+    args = parser.parse_args()
+
+    print(f"{'days':>6} {'':>7} {'period':>7} {'rects':>8} {'JSON KB':>9} {'Arrow KB':>9} {'prep (s)':>9}")
+    for days in args.days:
+        visits = add_domain(make_visits(args.visits, days=days))
+        visits["visit_time"] = chrome_column_to_datetime(visits["visit_time"])
+        store = HistoryStore(visits)
+
+        (before, _), before_s = timed(from_visits, store.visits())
+        (period, after), after_s = timed(store.activity.heatmap_frame, HEATMAP_MAX_MARKS)
+        _, rerun_s = timed(store.activity.heatmap_frame, HEATMAP_MAX_MARKS)
+
+        for label, frame, period_name, prep_s in (("before", before[['date_str', 'hour', 'visit_count']], "day", before_s),
+                                                  ("after", after[['date_str', 'hour', 'visit_count']], period, after_s)):
+            arrow_bytes, _ = arrow_payload(frame)
+            print(f"{days:>6} {label:>7} {period_name:>7} {len(frame):>8,} {json_payload(frame) / 1024:>9.1f} "
+                  f"{arrow_bytes / 1024:>9.1f} {prep_s:>9.3f}")
+        same_hash = arrow_payload(after)[1] == arrow_payload(store.activity.heatmap_frame(HEATMAP_MAX_MARKS)[1])[1]
+        print(f"{'':>6} {'rerun':>7} {'':>7} {'':>8} {'':>9} {'':>9} {rerun_s:>9.4f}   "
+              f"dataset hash {'unchanged (not re-sent)' if same_hash else 'CHANGED'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app_functions import DomainCache, add_domain, extract_domain
+from measure import timed
+from synthetic import make_visits
+
+# ----------------------------------------------------------
+# Benchmark: domain extraction (per-row apply vs. per-unique)
+# ----------------------------------------------------------
+
+#the original add_domain: urlparse on every row
+def add_domain_apply(df):
+    df = df.copy()
+    df["domain"] = df["url"].apply(extract_domain)
+    return df
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-unique-url domain extraction against per-row urlparse.")
+    parser.add_argument("--visits", type=int, default=1_000_000)
+    parser.add_argument("--urls-per-domain", type=int, default=20)
+    args = parser.parse_args()
+
+    df = make_visits(args.visits, urls_per_domain=args.urls_per_domain)
+    n_unique = df["url"].nunique()
+    print(f"{args.visits:,} visits, {n_unique:,} distinct urls ({args.visits / n_unique:.1f} visits per url)")
+
+    old, old_s = timed(add_domain_apply, df)
+    new, new_s = timed(add_domain, df)
+    assert old["domain"].equals(new["domain"]), "add_domain disagrees with per-row extract_domain"
+
+    cache = DomainCache()
+    _, cold_s = timed(add_domain, df, cache)
+    _, warm_s = timed(add_domain, df, cache) #same history uploaded again in the session
+
+    print(f"{'per-row apply':<28} {old_s:>8.3f} s")
+    print(f"{'per-unique (no memo)':<28} {new_s:>8.3f} s  {old_s / new_s:>5.1f}x")
+    print(f"{'per-unique, cold memo':<28} {cold_s:>8.3f} s  {old_s / cold_s:>5.1f}x")
+    print(f"{'per-unique, warm memo':<28} {warm_s:>8.3f} s  {old_s / warm_s:>5.1f}x  (hits {cache.hits:,}, misses {cache.misses:,})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import argparse
+import io
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from app_functions import (HistoryStore, HistoryView, export_sessions_parquet, export_visits_parquet,
+                           load_history_streaming, read_history_export)
+from measure import timed
+from synthetic import write_synthetic_history
+
+# -------------------------------------------------------------------
+# Benchmark: analyzing a History file vs. re-uploading its export
+# -------------------------------------------------------------------
+
+KEYWORDS = ["weather", "login"]
+
+#what Home.py does with a History file: stream it in, build the store, apply keywords
+def from_history(db_path):
+    visits, _ = load_history_streaming(db_path, "chrome", {}, sessionize=False)
+    return HistoryView(HistoryStore(visits), KEYWORDS)
+
+#what Home.py does with an export: read it and build the store around its sessions
+def from_export(data):
+    visits, sessions_at, _ = read_history_export(io.BytesIO(data))
+    return HistoryView(HistoryStore(visits, sessions_at=sessions_at))
+
+#strings in an exported file (values and dictionaries) containing any of [keywords], case-insensitive
+def leaked(data, keywords):
+    found = set()
+    for column in pq.read_table(io.BytesIO(data)).columns:
+        for chunk in column.chunks:
+            values = chunk.dictionary if pa.types.is_dictionary(chunk.type) else chunk
+            if pa.types.is_string(values.type) or pa.types.is_large_string(values.type):
+                found.update(v for v in values.to_pylist() if v and any(k.lower() in v.lower() for k in keywords))
+    return found
+
+def main():
+    parser = argparse.ArgumentParser(description="Time a full History upload against re-uploading its Parquet export.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'visits':>10} {'History MB':>11} {'export MB':>10} {'pipeline (s)':>13} {'export (s)':>11} {'re-upload (s)':>14}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.sizes:
+            db_path = str(Path(tmp) / f"History-{n}")
+            write_synthetic_history(db_path, "chrome", n)
+            view, pipeline_s = timed(from_history, db_path)
+            data, export_s = timed(export_visits_parquet, view, "chrome")
+            again, import_s = timed(from_export, data)
+
+            for name, exported in (("visits", data), ("sessions", export_sessions_parquet(view))):
+                if leaked(exported, KEYWORDS):
+                    sys.exit(f"the {name} export holds strings of filtered visits: {sorted(leaked(exported, KEYWORDS))[:3]}")
+
+            same = view.visits().astype(object).equals(again.visits().astype(object)) and \
+                view.sessions().astype(object).equals(again.sessions().astype(object))
+            print(f"{n:>10,} {os.path.getsize(db_path) / 1e6:>11.1f} {len(data) / 1e6:>10.1f} {pipeline_s:>13.2f} "
+                  f"{export_s:>11.2f} {import_s:>14.2f}   {'same' if same else 'DIFFERENT'}")
+            if not same:
+                sys.exit(1)
+
+if __name__ == "__main__":
+    main()
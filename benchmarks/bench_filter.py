@@ -0,0 +1,52 @@
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app_functions import filter_data
+from measure import timed
+from synthetic import make_visits
+
+# -------------------------------------------------
+# Benchmark: keyword filtering (regex vs. iterrows)
+# -------------------------------------------------
+
+#the original row-by-row filter from Home.py, kept here as the reference implementation
+def filter_data_iterrows(df, keywords):
+    dropped_indices = []
+    for index, row in df.iterrows():
+        for keyword in keywords.keys():
+            if row.astype(str).str.contains(keyword, case=False).any():
+                dropped_indices.append(index)
+                break
+    return df.drop(dropped_indices)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare vectorized keyword filtering against the iterrows version.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--keywords", nargs="+", default=["weather", "Recipe", "site4.com", "login"])
+    parser.add_argument("--legacy-max-rows", type=int, default=5_000,
+                        help="time the iterrows version on at most this many rows and extrapolate linearly")
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'iterrows (s)':>14} {'vectorized (s)':>15} {'speedup':>9}")
+    for n in args.sizes:
+        df = make_visits(n)
+        keywords = {k: 0 for k in args.keywords}
+        new_df, new_s = timed(filter_data, df, keywords)
+
+        sample = df.head(min(n, args.legacy_max_rows))
+        old_df, old_s = timed(filter_data_iterrows, sample, dict(keywords))
+        expected = new_df.index[new_df.index < len(sample)]
+        assert old_df.index.equals(expected), "vectorized filter disagrees with iterrows filter"
+        note = ""
+        if len(sample) < n:
+            old_s *= n / len(sample)
+            note = " (extrapolated)"
+
+        print(f"{n:>10,} {old_s:>14.3f} {new_s:>15.3f} {old_s / new_s:>8.0f}x{note}")
+        print(f"{'':>10} removed per keyword: {keywords}")
+
+if __name__ == "__main__":
+    main()
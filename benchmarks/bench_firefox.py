@@ -0,0 +1,78 @@
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app_functions import (add_domain, filter_data, firefox_column_to_datetime, load_firefox_history_db,
+                           load_history_pushdown, load_history_streaming)
+from measure import peak_rss_mb, report, run_child
+from synthetic import make_visits, write_firefox_db, write_synthetic_history
+
+# --------------------------------------------------------------------
+# Benchmark: firefox places.sqlite, url parsing vs. rev_host streaming
+# --------------------------------------------------------------------
+
+KEYWORDS = ["weather", "login"]
+
+#load everything, then filter, parse every distinct url for its domain and convert times
+def load_at_once(db_path):
+    df = filter_data(load_firefox_history_db(db_path), {k: 0 for k in KEYWORDS})
+    df = add_domain(df)
+    df["visit_time"] = firefox_column_to_datetime(df["visit_time"])
+    return df.reset_index(drop=True)
+
+def load_streaming(db_path, chunksize=100_000):
+    return load_history_streaming(db_path, "firefox", {k: 0 for k in KEYWORDS}, chunksize=chunksize, sessionize=False)[0]
+
+def load_pushdown(db_path):
+    return load_history_pushdown(db_path, "firefox", {k: 0 for k in KEYWORDS})
+
+MODES = {"at-once": load_at_once, "streaming": load_streaming, "pushdown": load_pushdown}
+
+#child process: run one mode and report seconds + peak RSS growth (MB)
+def measure(mode, db_path):
+    before = peak_rss_mb()
+    start = time.perf_counter()
+    MODES[mode](db_path)
+    report(seconds=time.perf_counter() - start, peak_mb=peak_rss_mb() - before)
+
+def check_equivalence(db_path):
+    visits = load_at_once(db_path)
+    for chunksize in (997, 10_000):
+        pd.testing.assert_frame_equal(visits, load_streaming(db_path, chunksize), check_dtype=False)
+    pd.testing.assert_frame_equal(visits, load_pushdown(db_path), check_dtype=False)
+    #uploads up to 64 MB are read from memory, and places.sqlite is a WAL-mode file
+    pd.testing.assert_frame_equal(visits, load_streaming(Path(db_path).read_bytes()), check_dtype=False)
+    print("equivalence: rev_host domains (streaming, from disk or memory) and pushdown match parsing every url")
+
+def main():
+    parser = argparse.ArgumentParser(description="Time and peak memory of loading a synthetic places.sqlite.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--measure", nargs=2, metavar=("MODE", "DB"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.measure:
+        measure(*args.measure)
+        return
+
+    with tempfile.TemporaryDirectory() as db_dir:
+        small = str(Path(db_dir) / "small.sqlite")
+        visits = make_visits(30_000, days=20, browser="firefox", search_mix=True)
+        visits.loc[:2, "url"] = ["about:preferences", "http://localhost:8080/admin", "moz-extension://abc/page.html"]
+        write_firefox_db(small, visits)
+        check_equivalence(small)
+
+        print(f"{'visits':>10} " + " ".join(f"{m + ' s':>14} {m + ' MB':>15}" for m in MODES))
+        for n in args.sizes:
+            db_path = str(Path(db_dir) / f"places_{n}.sqlite")
+            write_synthetic_history(db_path, "firefox", n)
+            runs = [run_child(__file__, "--measure", mode, db_path) for mode in MODES]
+            print(f"{n:>10,} " + " ".join(f"{r['seconds']:>14.2f} {r['peak_mb']:>15.0f}" for r in runs))
+    print("peak MB = growth of peak RSS over the interpreter baseline")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import argparse
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app_functions import ActivityCube, HistoryStore, add_domain, chrome_column_to_datetime
+from measure import timed
+from synthetic import make_visits
+
+# ----------------------------------------------------------------
+# Benchmark: heatmap data + activity metrics, visit rows vs. cube
+# ----------------------------------------------------------------
+
+#what create_hourly_heatmap computed from the visit table on every render
+def from_visits(df):
+    df = df.copy()
+    df['hour'] = df['visit_time'].dt.hour
+    df['date'] = df['visit_time'].dt.date
+    heatmap_data = df.groupby(['date', 'hour']).size().reset_index(name='visit_count')
+    all_combinations = pd.DataFrame({'date': df['date'].unique()}).merge(pd.DataFrame({'hour': range(24)}), how='cross')
+    heatmap_data = all_combinations.merge(heatmap_data, on=['date', 'hour'], how='left').fillna(0)
+    heatmap_data['date_str'] = pd.to_datetime(heatmap_data['date']).dt.strftime('%Y-%m-%d')
+    metrics = (df['hour'].mode()[0], len(df), df.groupby('hour').size().mean())
+    return heatmap_data, metrics
+
+def from_cube(activity):
+    hourly = activity.hourly()
+    return activity.to_frame('day'), (int(hourly.argmax()), activity.total(), hourly[hourly > 0].mean())
+
+def main():
+    parser = argparse.ArgumentParser(description="Time heatmap preparation from visit rows against the activity cube.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--days", type=int, default=365)
+    args = parser.parse_args()
+
+    print(f"{'visits':>10} {'rows (s)':>10} {'cube build (s)':>15} {'cube read (s)':>14}")
+    for n in args.sizes:
+        visits = add_domain(make_visits(n, days=args.days))
+        visits["visit_time"] = chrome_column_to_datetime(visits["visit_time"])
+        store = HistoryStore(visits)
+        (old, old_metrics), old_s = timed(from_visits, store.visits())
+        activity, build_s = timed(ActivityCube, store.visit_time)
+        (new, new_metrics), read_s = timed(from_cube, activity)
+
+        old = old.sort_values(['date_str', 'hour'])
+        same = old['date_str'].tolist() == new['date_str'].tolist() and \
+            (old['visit_count'].to_numpy() == new['visit_count'].to_numpy()).all() and \
+            old_metrics[:2] == new_metrics[:2] and abs(old_metrics[2] - new_metrics[2]) < 1e-9
+        print(f"{n:>10,} {old_s:>10.3f} {build_s:>15.4f} {read_s:>14.4f}   {'same' if same else 'DIFFERENT'}")
+        if not same:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import argparse
+import contextlib
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app_functions import HistoryStore, IngestJob, load_history_streaming
+from synthetic import write_synthetic_history
+
+# ----------------------------------------------------------------------
+# Benchmark: blocking upload vs. background upload with partial results
+# ----------------------------------------------------------------------
+
+#what Home.py does for small files: read everything, then build the store
+def blocking(db_path):
+    visits, _ = load_history_streaming(db_path, "chrome", {}, sessionize=False)
+    return HistoryStore(visits)
+
+#the background path: seconds until the first partial store, every publish (seconds, visits) and the final store
+def background(db_path, poll_s=0.01):
+    start = time.perf_counter()
+    job = IngestJob(contextlib.nullcontext(db_path), None, {}).start()
+    published, version = [], 0
+    while True:
+        snapshot = job.snapshot()
+        if snapshot["version"] != version:
+            version = snapshot["version"]
+            published.append((time.perf_counter() - start, len(snapshot["store"])))
+        if snapshot["done"]:
+            if snapshot["error"] is not None:
+                sys.exit(snapshot["error"])
+            return published, snapshot["store"]
+        time.sleep(poll_s)
+
+def main():
+    parser = argparse.ArgumentParser(description="Time to first results of a background upload vs. a blocking one.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[300_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'visits':>10} {'blocking (s)':>13} {'first partial (s)':>18} {'background (s)':>15}  partial sizes")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.sizes:
+            db_path = str(Path(tmp) / f"History-{n}")
+            write_synthetic_history(db_path, "chrome", n)
+            start = time.perf_counter()
+            reference = blocking(db_path)
+            blocking_s = time.perf_counter() - start
+            published, store = background(db_path)
+
+            same = reference.visits().astype(object).equals(store.visits().astype(object)) and \
+                reference.sessions().astype(object).equals(store.sessions().astype(object))
+            sizes = ", ".join(f"{rows:,}" for _, rows in published)
+            print(f"{n:>10,} {blocking_s:>13.2f} {published[0][0]:>18.2f} {published[-1][0]:>15.2f}  {sizes}   "
+                  f"{'same' if same else 'DIFFERENT'}")
+            if not same:
+                sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import argparse
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app_functions import ingest_history_file, ingest_history_files, merge_profiles
+from synthetic import make_visits, write_chrome_db, write_safari_db, write_synthetic_history
+
+# ---------------------------------------------------------------
+# Benchmark: multi-profile uploads, one file after another vs. pool
+# ---------------------------------------------------------------
+
+KEYWORDS = {"weather": 0, "login": 0}
+
+def sequential(paths, pushdown):
+    return [ingest_history_file(path, KEYWORDS, pushdown) for path in paths]
+
+def parallel(paths, pushdown, pool):
+    results = ingest_history_files(paths, KEYWORDS, pushdown, pool)
+    return [result for result, _ in results]
+
+def merged(results):
+    return merge_profiles([visits for _, visits, _ in results], [f"Profile {i}" for i in range(len(results))])
+
+#files that load to visits with object categories: no visits at all, and an older Safari db without titles
+def check_odd_files(tmp, pool):
+    empty = str(Path(tmp) / "History-empty")
+    write_chrome_db(empty, make_visits(0))
+    untitled = str(Path(tmp) / "History-untitled.db")
+    write_safari_db(untitled, make_visits(5_000, browser="safari", seed=1))
+    conn = sqlite3.connect(untitled)
+    conn.execute("ALTER TABLE history_visits DROP COLUMN title")
+    conn.close()
+    normal = str(Path(tmp) / "History-normal")
+    write_chrome_db(normal, make_visits(5_000, seed=2))
+
+    paths = [normal, empty, untitled]
+    one_by_one, at_once = sequential(paths, False), parallel(paths, False, pool)
+    together = merged(one_by_one)
+    if not together.equals(merged(at_once)):
+        sys.exit("odd files: the pool's merge differs from loading one by one")
+    for i, (_, visits, _) in enumerate(one_by_one):
+        profile = together[together["profile"] == f"Profile {i}"].drop(columns="profile").astype(object)
+        expected = visits[profile.columns].astype(object).sort_values("visit_time", kind="stable")
+        if not profile.reset_index(drop=True).equals(expected.reset_index(drop=True)):
+            sys.exit(f"odd files: profile {i} lost or changed visits in the merge")
+    print("equivalence: an empty file and a Safari file without titles merge with the others")
+
+def main():
+    parser = argparse.ArgumentParser(description="Time loading several History files one after another and in a process pool.")
+    parser.add_argument("--files", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--visits", type=int, default=300_000, help="visits per file")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--pushdown", action="store_true")
+    args = parser.parse_args()
+
+    pool = ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context("spawn"))
+    list(pool.map(abs, range(args.workers)))   #start the workers up front; the app's pool outlives uploads too
+    print(f"{args.visits:,} visits per file, {args.workers} workers")
+    print(f"{'files':>6} {'sequential (s)':>15} {'pool (s)':>9} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        check_odd_files(tmp, pool)
+        paths = []
+        for i in range(max(args.files)):
+            paths.append(str(Path(tmp) / f"History-{i}"))
+            write_synthetic_history(paths[-1], "chrome", args.visits, seed=100 * i)
+        for n in args.files:
+            start = time.perf_counter()
+            one_by_one = sequential(paths[:n], args.pushdown)
+            sequential_s = time.perf_counter() - start
+            start = time.perf_counter()
+            at_once = parallel(paths[:n], args.pushdown, pool)
+            pool_s = time.perf_counter() - start
+
+            same = merged(one_by_one).equals(merged(at_once)) and \
+                [k for _, _, k in one_by_one] == [k for _, _, k in at_once]
+            print(f"{n:>6} {sequential_s:>15.2f} {pool_s:>9.2f} {sequential_s / pool_s:>7.1f}x   "
+                  f"{'same' if same else 'DIFFERENT'}")
+            if not same:
+                sys.exit(1)
+    pool.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import argparse
+import json
+import platform
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app_functions import (HistoryStore, add_domain, add_session_length, chrome_column_to_datetime, detect_browser,
+                           filter_data, load_chrome_history_db, load_safari_history_db, safari_column_to_datetime,
+                           split_sessions)
+from measure import current_rss_mb, peak_rss_mb, reset_peak_rss, run_child
+from synthetic import write_synthetic_history
+
+# ------------------------------------------------------------------
+# Benchmark: the upload pipeline stage by stage, reported as JSON
+# ------------------------------------------------------------------
+
+KEYWORDS = ["weather", "login"]
+LOADERS = {"chrome": load_chrome_history_db, "safari": load_safari_history_db}
+TIME_CONVERTERS = {"chrome": chrome_column_to_datetime, "safari": safari_column_to_datetime}
+
+#run fn(value) as one stage: wall time, rows in/out, peak RSS during the stage and RSS left behind
+def run_stage(stages, name, fn, value, rows_in):
+    reset_peak_rss()
+    before = current_rss_mb()
+    start = time.perf_counter()
+    result = fn(value)
+    seconds = time.perf_counter() - start
+    rows_out = len(result) if hasattr(result, "__len__") and not isinstance(result, str) else rows_in
+    stages.append({"stage": name, "seconds": round(seconds, 6), "rows_in": rows_in, "rows_out": rows_out,
+                   "rows_per_s": round(rows_in / seconds) if seconds > 0 else None,
+                   "peak_rss_mb": round(peak_rss_mb(), 1), "rss_delta_mb": round(current_rss_mb() - before, 1)})
+    return result
+
+def with_times(browser):
+    def convert(df):
+        df = df.copy()
+        df["visit_time"] = TIME_CONVERTERS[browser](df["visit_time"])
+        return df
+    return convert
+
+#child process: every stage of Home.py's upload path on one file
+def measure(db_path, store):
+    stages = []
+    browser = run_stage(stages, "detect_browser", detect_browser, db_path, 0)
+    rows = sqlite3.connect(db_path).execute("SELECT COUNT(*) FROM " +
+                                            ("visits" if browser == "chrome" else "history_visits")).fetchone()[0]
+    df = run_stage(stages, f"load_{browser}_history_db", LOADERS[browser], db_path, rows)
+    df = run_stage(stages, "filter_data", lambda d: filter_data(d, {k: 0 for k in KEYWORDS}), df, len(df))
+    df = run_stage(stages, "add_domain", add_domain, df, len(df))
+    df = run_stage(stages, f"{browser}_column_to_datetime", with_times(browser), df, len(df))
+    sessions = run_stage(stages, "split_sessions", split_sessions, df, len(df))
+    run_stage(stages, "add_session_length", add_session_length, sessions, len(sessions))
+    if store == "yes":
+        run_stage(stages, "HistoryStore", HistoryStore, df, len(df))
+    print(json.dumps({"browser": browser, "visits": rows, "stages": stages}))
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=Path(__file__).resolve().parent, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def meta():
+    return {"timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"), "git_commit": git_commit(),
+            "python": platform.python_version(), "pandas": pd.__version__, "numpy": np.__version__,
+            "sqlite": sqlite3.sqlite_version, "machine": platform.machine(), "keywords": KEYWORDS}
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        measure(*sys.argv[2:])
+        return
+    parser = argparse.ArgumentParser(description="Time each stage of the upload pipeline on synthetic History files.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--browser", choices=sorted(LOADERS), default="chrome")
+    parser.add_argument("--db", help="time an existing History file instead of generated ones")
+    parser.add_argument("--no-store", action="store_true", help="skip building the HistoryStore")
+    parser.add_argument("--out", help="also write the JSON report here")
+    args = parser.parse_args()
+
+    runs = []
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [args.db] if args.db else []
+        for n in ([] if args.db else args.sizes):
+            paths.append(str(Path(tmp) / f"{args.browser}-{n}.sqlite"))
+            write_synthetic_history(paths[-1], args.browser, n)
+        for path in paths:
+            #each file runs in a fresh interpreter so peaks don't carry over between sizes
+            run = run_child(__file__, "--child", path, "no" if args.no_store else "yes")
+            runs.append(run)
+            for stage in run["stages"]:
+                print(f"{run['visits']:>10,} {stage['stage']:<28} {stage['seconds']:>9.3f} s "
+                      f"{stage['rows_per_s'] or 0:>13,} rows/s {stage['peak_rss_mb']:>8.1f} MB peak", file=sys.stderr)
+
+    report = {"meta": meta(), "runs": runs}
+    print(json.dumps(report, indent=2))
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
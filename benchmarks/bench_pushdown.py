@@ -0,0 +1,88 @@
+import argparse
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app_functions import (add_domain, chrome_column_to_datetime, filter_data, load_chrome_history_db,
+                           load_history_pushdown, load_safari_history_db, safari_column_to_datetime)
+from measure import peak_rss_mb, report, run_child
+from synthetic import make_visits, write_chrome_db, write_safari_db
+
+# -------------------------------------------------------
+# Benchmark + parity: SQL pushdown vs. the pandas pipeline
+# -------------------------------------------------------
+
+LOADERS = {"chrome": (load_chrome_history_db, chrome_column_to_datetime, write_chrome_db),
+           "safari": (load_safari_history_db, safari_column_to_datetime, write_safari_db)}
+
+#the one-shot pipeline: load everything, then filter, add domains and convert times in pandas
+def pandas_pipeline(db_path, browser, keywords):
+    load, convert, _ = LOADERS[browser]
+    df = filter_data(load(db_path), keywords)
+    df = add_domain(df)
+    df["visit_time"] = convert(df["visit_time"])
+    return df
+
+def canonical(df):
+    return df.sort_values(["visit_time", "url", "title"], kind="stable", na_position="first").reset_index(drop=True)
+
+LOADS = {"pandas": pandas_pipeline, "pushdown": load_history_pushdown}
+
+#child process: run one loader and print seconds + peak RSS growth (MB) as JSON
+def measure(mode, db_path, browser, keywords):
+    before = peak_rss_mb()
+    start = time.perf_counter()
+    LOADS[mode](db_path, browser, {k: 0 for k in keywords})
+    report(seconds=time.perf_counter() - start, peak_mb=peak_rss_mb() - before)
+
+def measure_in_child(mode, db_path, browser, keywords):
+    return run_child(__file__, "--measure", mode, db_path, browser, "--keywords", *keywords)
+
+def run(browser, n, keywords, db_dir):
+    db_path = str(Path(db_dir) / f"{browser}_{n}.db")
+    LOADERS[browser][2](db_path, make_visits(n, browser=browser))
+
+    old_keywords, new_keywords = {k: 0 for k in keywords}, {k: 0 for k in keywords}
+    old = pandas_pipeline(db_path, browser, old_keywords)
+    new = load_history_pushdown(db_path, browser, new_keywords)
+    pd.testing.assert_frame_equal(canonical(old), canonical(new), check_dtype=False)
+    assert old_keywords == new_keywords, (old_keywords, new_keywords)
+
+    #small uploads are read from memory: a WAL-mode file (like Safari's and Firefox's) must load the same as from disk
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.close()
+    from_bytes = load_history_pushdown(Path(db_path).read_bytes(), browser, {k: 0 for k in keywords})
+    pd.testing.assert_frame_equal(new, from_bytes)
+
+    old_run = measure_in_child("pandas", db_path, browser, keywords)
+    new_run = measure_in_child("pushdown", db_path, browser, keywords)
+    print(f"{browser:>7} {n:>10,} {len(new):>10,} {old_run['seconds']:>11.3f} {new_run['seconds']:>13.3f} "
+          f"{old_run['peak_mb']:>13.0f} {new_run['peak_mb']:>15.0f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Check SQL pushdown loading against the pandas pipeline and time both.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--keywords", nargs="+", default=["weather", "Recipe", "site4.com", "login", "café"])
+    parser.add_argument("--measure", nargs=3, metavar=("MODE", "DB", "BROWSER"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.measure:
+        measure(*args.measure, args.keywords)
+        return
+
+    print(f"{'browser':>7} {'visits':>10} {'kept':>10} {'pandas (s)':>11} {'pushdown (s)':>13} "
+          f"{'pandas peak MB':>13} {'pushdown peak MB':>15}")
+    with tempfile.TemporaryDirectory() as db_dir:
+        for browser in LOADERS:
+            for n in args.sizes:
+                run(browser, n, args.keywords, db_dir)
+    print("parity: pushdown rows, domains, times and keyword counts match the pandas pipeline")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app_functions import (HistoryStore, HistoryView, add_domain, add_session_length, chrome_column_to_datetime,
+                           filter_data, split_sessions)
+from synthetic import make_visits
+
+# ------------------------------------------------------------------
+# Benchmark: changing keywords on a HistoryView vs. re-running filter
+# ------------------------------------------------------------------
+
+#missing titles come back as NaN from the store and None from the pipeline
+def same_frame(a, b):
+    a, b = a.astype(object), b.astype(object)
+    return a.columns.equals(b.columns) and len(a) == len(b) and \
+        a.where(a.notna(), None).values.tolist() == b.where(b.notna(), None).values.tolist()
+
+def main():
+    parser = argparse.ArgumentParser(description="Time keyword changes on a HistoryView against a full re-filter.")
+    parser.add_argument("--visits", type=int, default=500_000)
+    parser.add_argument("--steps", nargs="+", default=["weather", "weather,site4.com", "site4.com",
+                                                          "site4.com,login,Recipe", ""],
+                        help="keyword sets applied in order (comma-separated)")
+    args = parser.parse_args()
+
+    visits = add_domain(make_visits(args.visits))
+    visits["visit_time"] = chrome_column_to_datetime(visits["visit_time"])
+    view = HistoryView(HistoryStore(visits))
+    print(f"{len(visits):,} visits, {view.n_sessions:,} sessions")
+
+    for step in args.steps:
+        keywords = [k for k in step.split(",") if k]
+        start = time.perf_counter()
+        view.set_keywords(keywords)
+        incremental = time.perf_counter() - start
+
+        start = time.perf_counter()
+        counts = {k: 0 for k in keywords}
+        kept = filter_data(visits, counts).reset_index(drop=True)
+        sessions = add_session_length(split_sessions(kept))
+        full = time.perf_counter() - start
+
+        ok = same_frame(view.visits()[kept.columns], kept) and same_frame(view.sessions(), sessions) and \
+            view.removed_counts() == counts
+        print(f"  {','.join(keywords) or '(none)':<24} incremental {incremental * 1000:>8.1f} ms   "
+              f"full {full * 1000:>8.1f} ms   {len(view):>9,} kept   {'same' if ok else 'DIFFERENT'}")
+        if not ok:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
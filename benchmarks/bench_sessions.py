@@ -0,0 +1,111 @@
+import argparse
+import sys
+import time
+from datetime import timedelta
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app_functions import add_domain, chrome_column_to_datetime, split_sessions
+from synthetic import make_visits
+
+# ---------------------------------------------------
+# Benchmark: sessionization (vectorized vs. iterrows)
+# ---------------------------------------------------
+
+#the original iterrows split_sessions, kept here as the reference implementation
+def split_sessions_iterrows(df, session_length=30):
+    df = df.sort_values(['domain', 'visit_time'])
+    current_sessions = {}
+    all_sessions = []
+    for index, row in df.iterrows():
+        curr_domain = row['domain']
+        curr_visit_time = row['visit_time']
+        if curr_domain in current_sessions:
+            curr_session = current_sessions[curr_domain]
+            if (curr_visit_time - curr_session['session_start']) > timedelta(minutes=session_length):
+                all_sessions.append(curr_session)
+                current_sessions[curr_domain] = {
+                    'domain': curr_domain,
+                    'title': row['title'] if pd.notna(row['title']) and row['title'].strip() else 'Untitled',
+                    'url': row['url'],
+                    'session_start': curr_visit_time,
+                    'session_end': curr_visit_time,
+                    'visit_count': 1
+                }
+            else:
+                curr_session['session_end'] = curr_visit_time
+                curr_session['visit_count'] += 1
+                if (curr_session['title'] == 'Untitled' or not curr_session['title']) and pd.notna(row['title']) and row['title'].strip():
+                    curr_session['title'] = row['title']
+        else:
+            current_sessions[curr_domain] = {
+                'domain': curr_domain,
+                'title': row['title'] if pd.notna(row['title']) and row['title'].strip() else 'Untitled',
+                'url': row['url'],
+                'session_start': curr_visit_time,
+                'session_end': curr_visit_time,
+                'visit_count': 1
+            }
+    all_sessions.extend(current_sessions.values())
+    return pd.DataFrame(all_sessions)
+
+#visits the way Home.py hands them to split_sessions
+def prepare(n, seed=0, days=365):
+    df = add_domain(make_visits(n, days=days, seed=seed))
+    df["visit_time"] = chrome_column_to_datetime(df["visit_time"])
+    return df
+
+#tiny hand-made cases: ties, gap exactly at the boundary, blank/"Untitled" titles
+def edge_cases():
+    t0 = pd.Timestamp("2024-01-01 09:00", tz="UTC")
+    minutes = [0, 0, 30, 31, 31, 60, 95, 5, 200]
+    return pd.DataFrame({
+        "domain": ["a.com"] * 7 + ["b.com", "a.com"],
+        "title": [None, "  ", "Untitled", "Real", "", "Later", None, "B", "Last"],
+        "url": [f"https://a.com/{i}" for i in range(7)] + ["https://b.com/", "https://a.com/x"],
+        "visit_time": [(t0 + pd.Timedelta(minutes=m)).to_pydatetime() for m in minutes],
+    })
+
+def assert_same(old, new):
+    old = old.copy()
+    for col in ("session_start", "session_end"):
+        old[col] = pd.to_datetime(old[col], utc=True)
+        new = new.assign(**{col: pd.to_datetime(new[col], utc=True)})
+    pd.testing.assert_frame_equal(old, new, check_dtype=False)
+
+def check_equivalence():
+    assert_same(split_sessions_iterrows(edge_cases()), split_sessions(edge_cases()))
+    for length in (1, 30, 120):
+        assert_same(split_sessions_iterrows(edge_cases(), length), split_sessions(edge_cases(), length))
+    for seed in range(3):
+        df = prepare(3_000, seed=seed, days=3)
+        assert_same(split_sessions_iterrows(df), split_sessions(df))
+    print("equivalence: vectorized split_sessions matches the iterrows version")
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare vectorized split_sessions against the iterrows version.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--legacy-max-rows", type=int, default=100_000,
+                        help="time the iterrows version on at most this many rows and extrapolate linearly")
+    args = parser.parse_args()
+
+    check_equivalence()
+    print(f"{'visits':>10} {'sessions':>10} {'iterrows (s)':>14} {'vectorized (s)':>15} {'speedup':>9}")
+    for n in args.sizes:
+        df = prepare(n)
+        start = time.perf_counter()
+        sessions = split_sessions(df)
+        new_s = time.perf_counter() - start
+
+        sample = df.head(min(n, args.legacy_max_rows))
+        start = time.perf_counter()
+        split_sessions_iterrows(sample)
+        old_s = (time.perf_counter() - start) * n / len(sample)
+        note = " (extrapolated)" if len(sample) < n else ""
+        print(f"{n:>10,} {len(sessions):>10,} {old_s:>14.3f} {new_s:>15.3f} {old_s / new_s:>8.0f}x{note}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import app_functions
+from app_functions import session_positions
+from bench_sessions import prepare
+
+# -----------------------------------------------------------------
+# Benchmark: sessionizing in one pass vs. domain shards in threads
+# -----------------------------------------------------------------
+
+def timed(df, shards, repeat):
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = session_positions(df, shards=shards)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return result, best
+
+def main():
+    parser = argparse.ArgumentParser(description="Time session_positions with the visits split into domain shards.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000_000, 5_000_000])
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    #one thread per shard, however many cores the app would use
+    app_functions.SESSION_WORKERS = max(args.shards)
+    print(f"{os.cpu_count()} cores")
+    print(f"{'visits':>10} {'shards':>7} {'seconds':>8} {'speedup':>8}")
+    for n in args.sizes:
+        df = prepare(n)
+        reference, one_pass = timed(df, 1, args.repeat)
+        for shards in args.shards:
+            result, seconds = (reference, one_pass) if shards == 1 else timed(df, shards, args.repeat)
+            same = result.equals(reference)
+            print(f"{n:>10,} {shards:>7} {seconds:>8.3f} {one_pass / seconds:>7.2f}x   {'same' if same else 'DIFFERENT'}")
+            if not same:
+                sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import argparse
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app_functions import (HistoryStore, add_domain, add_session_length, chrome_column_to_datetime, filter_data,
+                           load_chrome_history_db, split_sessions)
+from synthetic import make_visits, write_chrome_db
+
+# -------------------------------------------------------------
+# Benchmark: bytes per visit, three DataFrames vs. HistoryStore
+# -------------------------------------------------------------
+
+def frame_bytes(df):
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare session-state memory per visit before/after HistoryStore.")
+    parser.add_argument("--visits", type=int, default=500_000)
+    parser.add_argument("--db", help="use an existing Chrome History file instead of a synthetic one")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as db_dir:
+        db_path = args.db
+        if db_path is None:
+            db_path = str(Path(db_dir) / "History")
+            write_chrome_db(db_path, make_visits(args.visits))
+
+        #what session_state used to hold: uploaded_df, raw_visit_data, raw_session_data
+        uploaded_df = filter_data(load_chrome_history_db(db_path), {})
+        raw_visit_data = add_domain(uploaded_df)
+        raw_visit_data["visit_time"] = chrome_column_to_datetime(raw_visit_data["visit_time"])
+        raw_session_data = add_session_length(split_sessions(raw_visit_data))
+        before = {name: frame_bytes(df) for name, df in
+                  [("uploaded_df", uploaded_df), ("raw_visit_data", raw_visit_data), ("raw_session_data", raw_session_data)]}
+
+        history = HistoryStore(raw_visit_data)
+        n = len(history)
+
+    print(f"{n:,} visits, {history.n_sessions:,} sessions")
+    for name, size in before.items():
+        print(f"  {name:<18} {size / n:>8.1f} bytes/visit")
+    print(f"  {'total before':<18} {sum(before.values()) / n:>8.1f} bytes/visit")
+    print(f"  {'HistoryStore':<18} {history.nbytes() / n:>8.1f} bytes/visit")
+    print(f"  materialized visits() {frame_bytes(history.visits()) / n:.1f}, sessions() {frame_bytes(history.sessions()) / n:.1f} "
+          "bytes/visit (built per page, not kept)")
+
+if __name__ == "__main__":
+    main()
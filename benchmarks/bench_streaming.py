@@ -0,0 +1,99 @@
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app_functions import (add_domain, chrome_column_to_datetime, filter_data, load_chrome_history_db,
+                           load_history_streaming, split_sessions)
+from measure import peak_rss_mb, report, run_child
+from synthetic import make_visits, write_chrome_db
+
+# ------------------------------------------------------------
+# Benchmark: streaming (chunked) ingestion vs. loading at once
+# ------------------------------------------------------------
+
+KEYWORDS = ["weather", "login"]
+
+#load everything, then filter, add domains, convert times and sessionize
+def load_at_once(db_path):
+    df = filter_data(load_chrome_history_db(db_path), {k: 0 for k in KEYWORDS})
+    df = add_domain(df)
+    df["visit_time"] = chrome_column_to_datetime(df["visit_time"])
+    return df, split_sessions(df)
+
+#child process: run one mode and report seconds + peak RSS growth (MB)
+def measure(mode, db_path, chunksize):
+    before = peak_rss_mb()
+    start = time.perf_counter()
+    if mode == "at-once":
+        load_at_once(db_path)
+    else:
+        load_history_streaming(db_path, "chrome", {k: 0 for k in KEYWORDS}, chunksize=int(chunksize),
+                               keep_visits=(mode == "streaming"))
+    report(seconds=time.perf_counter() - start, peak_mb=peak_rss_mb() - before)
+
+def check_equivalence(db_path):
+    visits, sessions = load_at_once(db_path)
+    for chunksize in (997, 10_000):
+        s_visits, s_sessions = load_history_streaming(db_path, "chrome", {k: 0 for k in KEYWORDS}, chunksize=chunksize)
+        pd.testing.assert_frame_equal(visits.reset_index(drop=True), s_visits, check_dtype=False)
+        pd.testing.assert_frame_equal(sessions, s_sessions, check_dtype=False)
+    print("equivalence: streaming visits and sessions match loading at once")
+
+#a history of [urls] visited [minutes] after a fixed start, as a chrome History file
+def write_minutes(db_path, minutes, urls):
+    start = pd.Timestamp("2024-01-01", tz="UTC") - pd.Timestamp("1601-01-01", tz="UTC")
+    times = (start + pd.to_timedelta(minutes, unit="m")) // pd.Timedelta(microseconds=1)
+    write_chrome_db(db_path, pd.DataFrame({"url": urls, "title": "page", "visit_time": times}))
+
+#tiny chunks, where keywords can leave one visit per chunk and every visit opens a session of its own
+def check_small_chunks(db_dir):
+    db_path = str(Path(db_dir) / "small_chunks.db")
+    rng = np.random.default_rng(0)
+    cases = [([0, 1, 2, 17, 18, 19, 44], ["https://b.com/1", "https://a.com/secret", "https://a.com/secret2",
+                                          "https://b.com/2", "https://a.com/secret3", "https://a.com/secret4",
+                                          "https://b.com/3"], 3)]
+    for _ in range(300):
+        n = int(rng.integers(2, 12))
+        urls = rng.choice(["https://a.com/x", "https://b.com/y", "https://c.com/secret", "https://c.com/z"], n)
+        cases.append((np.sort(rng.integers(0, 200, n)), list(urls), int(rng.integers(1, 4))))
+    for minutes, urls, chunksize in cases:
+        Path(db_path).unlink(missing_ok=True)
+        write_minutes(db_path, minutes, urls)
+        visits, sessions = load_history_streaming(db_path, "chrome", {"secret": 0}, chunksize=chunksize)
+        pd.testing.assert_frame_equal(split_sessions(visits), sessions, check_dtype=False)
+    print(f"equivalence: streamed sessions match split_sessions for {len(cases)} histories read 1-3 visits at a time")
+
+def main():
+    parser = argparse.ArgumentParser(description="Peak memory and time of streaming ingestion by history size.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 500_000, 2_000_000])
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    parser.add_argument("--measure", nargs=2, metavar=("MODE", "DB"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.measure:
+        measure(*args.measure, args.chunksize)
+        return
+
+    with tempfile.TemporaryDirectory() as db_dir:
+        small = str(Path(db_dir) / "small.db")
+        write_chrome_db(small, make_visits(30_000, days=20))
+        check_equivalence(small)
+        check_small_chunks(db_dir)
+
+        modes = ["at-once", "streaming", "sessions-only"]
+        print(f"{'visits':>10} " + " ".join(f"{m + ' s':>16} {m + ' MB':>17}" for m in modes))
+        for n in args.sizes:
+            db_path = str(Path(db_dir) / f"chrome_{n}.db")
+            write_chrome_db(db_path, make_visits(n))
+            runs = [run_child(__file__, "--measure", mode, db_path, "--chunksize", args.chunksize) for mode in modes]
+            print(f"{n:>10,} " + " ".join(f"{r['seconds']:>16.2f} {r['peak_mb']:>17.0f}" for r in runs))
+    print("peak MB = growth of peak RSS over the interpreter baseline; 'sessions-only' keeps no visit rows")
+
+if __name__ == "__main__":
+    main()
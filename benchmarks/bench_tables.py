@@ -0,0 +1,70 @@
+import argparse
+import re
+import sys
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app_functions import HistoryStore, add_domain, chrome_column_to_datetime
+from measure import timed
+from synthetic import make_visits
+
+# ---------------------------------------------------------------------
+# Benchmark: sending a whole raw table vs. one sorted, filtered page
+# ---------------------------------------------------------------------
+
+PER_PAGE = 50
+
+def prepare(n):
+    df = add_domain(make_visits(n, days=max(30, n // 2_000)))
+    df["visit_time"] = chrome_column_to_datetime(df["visit_time"])
+    return HistoryStore(df)
+
+#Arrow bytes of a frame, roughly what st.dataframe sends to the browser
+def payload_bytes(df):
+    return pa.Table.from_pandas(df, preserve_index=False).nbytes
+
+#the page the pager serves must be the same rows pandas gives for a stable sort + contains filter
+def check_equivalence(store):
+    for pager, frame in ((store.visit_table(), store.visits()), (store.session_table(), store.sessions())):
+        for column in ("domain", "title", frame.columns[3], "visit_count" if "visit_count" in frame else "url"):
+            for descending in (False, True):
+                for domain, search in (("", ""), ("google", ""), ("", "login"), ("site1", "pag"), ("", "pyth goo")):
+                    rows = pager.rows(column, descending, domain, search)
+                    expected = frame
+                    if domain:
+                        expected = expected[expected["domain"].str.contains(domain, case=False, regex=False)]
+                    for term in search.split():    #every word starts a word of the url or title
+                        starts = r"(?<![^\W_])" + re.escape(term.upper())
+                        expected = expected[expected["url"].astype(object).str.upper().str.contains(starts, na=False) |
+                                            expected["title"].astype(object).str.upper().str.contains(starts, na=False)]
+                    #descending pages are the ascending order read backwards
+                    expected = expected.astype({column: object} if column in ("domain", "title", "url") else {}) \
+                        .sort_values(column, kind="stable", na_position="last")
+                    expected = expected.iloc[::-1] if descending else expected
+                    if not np.array_equal(rows, expected.index.to_numpy()):
+                        sys.exit(f"DIFFERENT: {column} descending={descending} domain={domain!r} search={search!r}")
+    print("equivalence: every sort/filter matches pandas on the full table")
+
+def main():
+    parser = argparse.ArgumentParser(description="Time and payload of showing a raw table whole vs. one page at a time.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    args = parser.parse_args()
+
+    check_equivalence(prepare(20_000))
+    print(f"{'visits':>10} {'full (s)':>9} {'full MB':>8} {'first page (s)':>15} {'next page (s)':>14} {'page KB':>8}")
+    for n in args.sizes:
+        store = prepare(n)
+        full, full_s = timed(store.visits)
+        pager = store.visit_table()
+        rows, first_s = timed(pager.rows, "visit_time", True, "", "")
+        page, _ = timed(pager.page, rows[:PER_PAGE])
+        _, next_s = timed(lambda: pager.page(pager.rows("visit_time", True, "", "")[PER_PAGE:2 * PER_PAGE]))
+        print(f"{n:>10,} {full_s:>9.3f} {payload_bytes(full) / 1e6:>8.1f} {first_s:>15.3f} {next_s:>14.4f} "
+              f"{payload_bytes(page) / 1e3:>8.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import argparse
+import re
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app_functions import HistoryStore, TextIndex, add_domain, chrome_column_to_datetime
+from measure import timed
+from synthetic import make_visits
+
+# ------------------------------------------------------------------
+# Benchmark: keyword masks and history search, str.contains vs index
+# ------------------------------------------------------------------
+
+KEYWORDS = ["weather", "login", "Docs", "s", "google.com", "new york"]
+QUERIES = ["wea", "python google", "pyth docs", "login 1", "zzz"]
+
+def prepare(n):
+    df = add_domain(make_visits(n, days=max(30, n // 2_000)))
+    df["visit_time"] = chrome_column_to_datetime(df["visit_time"])
+    #strings whose case-insensitive matching differs between string backends
+    df.loc[:4, "title"] = ["Straße LOGIN page", "logın", "ﬁle weather_report", "日本語 login", None]
+    return HistoryStore(df)
+
+#what keyword_mask did before the index: every distinct url and title scanned per keyword
+def scanned_mask(store, keyword):
+    mask = np.zeros(len(store), dtype=bool)
+    for col in (store.url, store.title):
+        hit = np.asarray(col.categories.str.contains(keyword, case=False, regex=False), dtype=bool)
+        mask |= np.append(hit, False)[col.codes]
+    return mask
+
+#every query word must start a word (run of letters/digits) of the url or title
+def scanned_search(store, query):
+    mask = np.ones(len(store), dtype=bool)
+    for term in re.findall(r"[^\W_]+", query):
+        pattern = r"(?<![^\W_])" + re.escape(term)
+        mask &= scanned_mask_regex(store, pattern)
+    return mask
+
+def scanned_mask_regex(store, pattern):
+    mask = np.zeros(len(store), dtype=bool)
+    for col in (store.url, store.title):
+        texts = col.categories.astype(object).str.upper()
+        hit = np.asarray(texts.str.contains(pattern.upper(), regex=True, na=False), dtype=bool)
+        mask |= np.append(hit, False)[col.codes]
+    return mask
+
+def main():
+    parser = argparse.ArgumentParser(description="Time keyword masks and history search with and without the text index.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'visits':>10} {'index build (s)':>16} {'index MB':>9} {'query':>14} {'scan (ms)':>10} {'index (ms)':>11}")
+    for n in args.sizes:
+        store = prepare(n)
+        index, build_s = timed(TextIndex, store.url, store.title)
+        codes = (store.url.codes, store.title.codes)
+        for keyword in KEYWORDS:
+            expected, scan_s = timed(scanned_mask, store, keyword)
+            mask, index_s = timed(store.keyword_mask, keyword)
+            print(f"{n:>10,} {build_s:>16.2f} {index.nbytes() / 1e6:>9.1f} {'-' + keyword:>14} {scan_s * 1e3:>10.1f} "
+                  f"{index_s * 1e3:>11.1f}   {'same' if np.array_equal(mask, expected) else 'DIFFERENT'}")
+            if not np.array_equal(mask, expected):
+                sys.exit(1)
+        for query in QUERIES:
+            expected, scan_s = timed(scanned_search, store, query)
+            mask, index_s = timed(index.search, query, *codes)
+            print(f"{n:>10,} {build_s:>16.2f} {index.nbytes() / 1e6:>9.1f} {query:>14} {scan_s * 1e3:>10.1f} "
+                  f"{index_s * 1e3:>11.1f}   {'same' if np.array_equal(mask, expected) else 'DIFFERENT'}")
+            if not np.array_equal(mask, expected):
+                sys.exit(1)
+
+if __name__ == "__main__":
+    main()
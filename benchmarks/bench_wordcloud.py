@@ -0,0 +1,53 @@
+import argparse
+import sys
+from pathlib import Path
+
+from wordcloud import WordCloud
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app_functions import HistoryStore, HistoryView, add_domain, chrome_column_to_datetime, frequency_digest
+from measure import timed
+from synthetic import make_visits
+
+# -----------------------------------------------------------------
+# Benchmark: word cloud input, re-tokenizing titles vs. word index
+# -----------------------------------------------------------------
+
+WORDCLOUD_ARGS = dict(width=1000, height=500, max_words=200, scale=2, random_state=16)
+
+#what render_wordcloud did on every page load: sort, scan titles, join, re-tokenize
+def from_visits(raw_data):
+    raw_data = raw_data.sort_values(by='visit_time').reset_index(drop=True)
+    raw_data[raw_data['title'].str.contains('Google Search', na=False)]
+    google_searches = raw_data[raw_data['title'].str.contains('Google Search', na=False, case=False)].copy()
+    google_searches['query'] = google_searches['title'].str.replace('- Google Search', '', regex=False)
+    all_words = ' '.join(google_searches['query'].dropna().astype(str))
+    return WordCloud(collocations=False, **WORDCLOUD_ARGS).process_text(all_words)
+
+def main():
+    parser = argparse.ArgumentParser(description="Time word cloud frequencies from titles against the word index.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--keywords", nargs="+", default=["weather", "hotel"])
+    args = parser.parse_args()
+
+    print(f"{'visits':>10} {'titles (s)':>11} {'index (s)':>10} {'filter (s)':>11} {'layout (s)':>11}")
+    for n in args.sizes:
+        visits = add_domain(make_visits(n))
+        visits["visit_time"] = chrome_column_to_datetime(visits["visit_time"])
+        view = HistoryView(HistoryStore(visits))
+
+        _, filter_s = timed(view.set_keywords, args.keywords)
+        old, old_s = timed(from_visits, view.visits())
+        new, new_s = timed(view.word_frequencies)
+        _, layout_s = timed(WordCloud(**WORDCLOUD_ARGS).generate_from_frequencies, new)
+
+        same = old == new and frequency_digest(new) == frequency_digest(view.word_frequencies())
+        print(f"{n:>10,} {old_s:>11.3f} {new_s:>10.4f} {filter_s:>11.3f} {layout_s:>11.3f}   "
+              f"{'same' if same else 'DIFFERENT'}")
+        if not same:
+            sys.exit(1)
+    print("layout runs once per frequency digest; reruns read the cached image")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import json
+import resource
+import subprocess
+import sys
+import time
+
+# ------------------------------------
+# Shared measurement helpers (benchmarks)
+# ------------------------------------
+
+#peak RSS of this process in MB (VmHWM on linux: ru_maxrss can carry over the parent's peak through fork/exec)
+def peak_rss_mb():
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+#resident set size of this process right now, in MB
+def current_rss_mb():
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return peak_rss_mb()
+
+#start a new peak from the current RSS, so peak_rss_mb() covers only what runs next (linux only, best effort)
+def reset_peak_rss():
+    try:
+        with open("/proc/self/clear_refs", "w") as clear_refs:
+            clear_refs.write("5")
+        return True
+    except OSError:
+        return False
+
+#(fn(*args), seconds it took)
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+#print one measurement as the last line of a child process's output
+def report(**values):
+    print(json.dumps(values))
+
+#run [script] [args...] in a fresh interpreter and return the JSON it reported
+def run_child(script, *args):
+    out = subprocess.run([sys.executable, script, *map(str, args)], capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
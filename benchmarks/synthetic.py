@@ -0,0 +1,227 @@
+import argparse
+import os
+import sqlite3
+from urllib.parse import urlparse
+
+import numpy as np
+import pandas as pd
+
+# ---------------------------------------
+# Synthetic browsing history (benchmarks)
+# ---------------------------------------
+
+CHROME_EPOCH_OFFSET_US = 11_644_473_600 * 1_000_000 #microseconds between 1601-01-01 and 1970-01-01
+SAFARI_EPOCH_OFFSET_S = 978_307_200                  #seconds between 1970-01-01 and 2001-01-01
+
+WORDS = [
+    "python", "pandas", "weather", "news", "recipe", "music", "video", "login", "docs", "email",
+    "shopping", "calendar", "maps", "flights", "hotel", "class", "homework", "lecture", "notes", "sports",
+]
+
+#search engine -> (share of searches, search url prefix, title suffixes); google titles are sometimes localized
+SEARCH_MIX = {
+    "google": (0.70, "https://www.google.com/search?q=", [" - Google Search", " - Google Suche", " - Recherche Google"]),
+    "bing": (0.10, "https://www.bing.com/search?form=QBLH&q=", [" - Search"]),
+    "duckduckgo": (0.08, "https://duckduckgo.com/?t=h_&q=", [" at DuckDuckGo"]),
+    "youtube": (0.10, "https://www.youtube.com/results?search_query=", [" - YouTube"]),
+    "yahoo": (0.02, "https://search.yahoo.com/search?p=", [" - Yahoo Search Results"]),
+}
+
+#zipf-distributed integers in [0, n) (a few very popular items, long tail of rare ones)
+def zipf_choice(rng, n, size, a=1.2):
+    weights = 1.0 / np.arange(1, n + 1) ** a
+    return rng.choice(n, size=size, p=weights / weights.sum())
+
+#search urls + titles for [n] searches: 1-3 word queries spread over SEARCH_MIX's engines
+def make_searches(rng, n):
+    n_words = rng.integers(1, 4, n)
+    picks = np.array(WORDS)[rng.integers(0, len(WORDS), (n, 3))]
+    text = pd.Series([" ".join(row[:k]) for row, k in zip(picks, n_words)], dtype=object)
+    names = list(SEARCH_MIX)
+    engine = rng.choice(len(names), size=n, p=[SEARCH_MIX[name][0] for name in names])
+    urls = pd.Series(np.full(n, "", dtype=object))
+    titles = pd.Series(np.full(n, "", dtype=object))
+    for i, name in enumerate(names):
+        rows = np.flatnonzero(engine == i)
+        _, prefix, suffixes = SEARCH_MIX[name]
+        suffix = np.array(suffixes, dtype=object)[rng.choice(len(suffixes), size=len(rows), p=_suffix_weights(len(suffixes)))]
+        urls[rows] = prefix + text[rows].str.replace(" ", "+", regex=False)
+        titles[rows] = text[rows] + suffix
+    return urls, titles
+
+#first title suffix (the english one) most of the time
+def _suffix_weights(n):
+    return [1.0] if n == 1 else [0.9] + [0.1 / (n - 1)] * (n - 1)
+
+#make a df shaped like load_chrome_history_db output (url, title, raw visit_time)
+#search_mix=True spreads ~5% searches over several engines with multi-word queries and some localized titles
+#(the default keeps single-word google searches, which older benchmarks compare against title-based code)
+def make_visits(n_visits, n_domains=2_000, urls_per_domain=20, days=365, browser="chrome", seed=0,
+                search_mix=False, start=1_700_000_000):
+    rng = np.random.default_rng(seed)
+    domains = np.array([f"site{i}.com" if i % 3 else f"www.site{i}.org" for i in range(n_domains)])
+
+    #urls repeat heavily: pick a domain, then one of a small set of paths on it
+    dom_idx = zipf_choice(rng, n_domains, n_visits)
+    path_idx = zipf_choice(rng, urls_per_domain, n_visits)
+    words = np.array(WORDS)[rng.integers(0, len(WORDS), n_visits)]
+    urls = pd.Series(np.char.add(np.char.add("https://", domains[dom_idx]), np.char.add("/", words)))
+    urls = urls + "/" + pd.Series(path_idx).astype(str)
+    titles = pd.Series(np.char.add(np.char.capitalize(words), " page")).astype(object)
+
+    #~5% google searches, ~2% missing titles, ~1% local files
+    kind = rng.random(n_visits)
+    search = kind < 0.05
+    query = np.array(WORDS)[rng.integers(0, len(WORDS), n_visits)]
+    if search_mix:
+        search_urls, search_titles = make_searches(rng, int(search.sum()))
+        urls[search], titles[search] = search_urls.to_numpy(), search_titles.to_numpy()
+    else:
+        urls[search] = "https://www.google.com/search?q=" + pd.Series(query)[search]
+        titles[search] = pd.Series(query)[search] + " - Google Search"
+    titles[(kind >= 0.05) & (kind < 0.07)] = None
+    local = (kind >= 0.07) & (kind < 0.08)
+    urls[local] = "file:///Users/me/Documents/" + pd.Series(words)[local] + ".pdf"
+
+    #sorted unix seconds over [days] days from [start]
+    seconds = np.sort(start + rng.integers(0, int(days * 86_400), n_visits))
+    if browser == "chrome":
+        visit_time = seconds * 1_000_000 + CHROME_EPOCH_OFFSET_US
+    elif browser == "safari":
+        visit_time = (seconds - SAFARI_EPOCH_OFFSET_S).astype(float) + rng.random(n_visits)
+    else: #firefox
+        visit_time = seconds * 1_000_000
+
+    return pd.DataFrame({"url": urls.astype(object), "title": titles, "visit_time": visit_time})
+
+# ---------------------------------------
+# Synthetic History databases (SQLite)
+# ---------------------------------------
+
+CHROME_SCHEMA = """
+    CREATE TABLE urls(id INTEGER PRIMARY KEY AUTOINCREMENT, url LONGVARCHAR, title LONGVARCHAR,
+        visit_count INTEGER DEFAULT 0 NOT NULL, typed_count INTEGER DEFAULT 0 NOT NULL,
+        last_visit_time INTEGER NOT NULL, hidden INTEGER DEFAULT 0 NOT NULL);
+    CREATE TABLE visits(id INTEGER PRIMARY KEY AUTOINCREMENT, url INTEGER NOT NULL, visit_time INTEGER NOT NULL,
+        from_visit INTEGER, transition INTEGER DEFAULT 0 NOT NULL, segment_id INTEGER, visit_duration INTEGER DEFAULT 0 NOT NULL);
+    CREATE INDEX visits_url_index ON visits (url);
+    CREATE INDEX visits_time_index ON visits (visit_time);
+"""
+
+SAFARI_SCHEMA = """
+    CREATE TABLE history_items(id INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT NOT NULL UNIQUE,
+        domain_expansion TEXT NULL, visit_count INTEGER NOT NULL, daily_visit_counts BLOB NOT NULL DEFAULT x'');
+    CREATE TABLE history_visits(id INTEGER PRIMARY KEY AUTOINCREMENT, history_item INTEGER NOT NULL,
+        visit_time REAL NOT NULL, title TEXT NULL, load_successful BOOLEAN NOT NULL DEFAULT 1);
+    CREATE INDEX history_visits__last_visit ON history_visits (history_item);
+"""
+
+FIREFOX_SCHEMA = """
+    CREATE TABLE moz_places(id INTEGER PRIMARY KEY, url LONGVARCHAR, title LONGVARCHAR, rev_host LONGVARCHAR,
+        visit_count INTEGER DEFAULT 0, hidden INTEGER DEFAULT 0 NOT NULL, typed INTEGER DEFAULT 0 NOT NULL,
+        frecency INTEGER DEFAULT -1 NOT NULL, last_visit_date INTEGER, guid TEXT, foreign_count INTEGER DEFAULT 0 NOT NULL,
+        url_hash INTEGER DEFAULT 0 NOT NULL, description TEXT, preview_image_url TEXT, origin_id INTEGER);
+    CREATE TABLE moz_historyvisits(id INTEGER PRIMARY KEY, from_visit INTEGER, place_id INTEGER, visit_date INTEGER,
+        visit_type INTEGER, session INTEGER, source INTEGER DEFAULT 0 NOT NULL, triggeringPlaceId INTEGER);
+    CREATE INDEX moz_places_hostindex ON moz_places (rev_host);
+    CREATE INDEX moz_historyvisits_placedateindex ON moz_historyvisits (place_id, visit_date);
+    CREATE INDEX moz_historyvisits_dateindex ON moz_historyvisits (visit_date);
+"""
+
+SCHEMAS = {"chrome": CHROME_SCHEMA, "safari": SAFARI_SCHEMA, "firefox": FIREFOX_SCHEMA}
+
+#firefox's rev_host: the url's host reversed, with a trailing dot ('www.google.com' -> 'moc.elgoog.www.')
+def rev_host(url):
+    return (urlparse(url).hostname or "")[::-1] + "."
+
+#write an iterable of visit chunks (make_visits output for [browser]) as one History file
+#url ids stay consistent across chunks, so only one chunk of strings is in memory at a time
+def write_history_db(path, browser, chunks):
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMAS[browser])
+    url_ids = {}
+    for visits in chunks:
+        codes, uniques = pd.factorize(visits["url"])
+        seen = len(url_ids)
+        ids = np.array([url_ids.setdefault(url, len(url_ids) + 1) for url in uniques])
+        is_new = ids > seen
+        titles = visits.groupby(codes, sort=True)["title"].first().to_numpy() #first non-missing title per url
+        if browser == "chrome":
+            conn.executemany(
+                "INSERT INTO urls(id, url, title, last_visit_time) VALUES (?, ?, ?, 0)",
+                ((int(i), url, None if pd.isna(t) else t) for i, url, t in zip(ids[is_new], uniques[is_new], titles[is_new])),
+            )
+            conn.executemany("INSERT INTO visits(url, visit_time) VALUES (?, ?)",
+                             zip(ids[codes].tolist(), visits["visit_time"].tolist()))
+        elif browser == "firefox":
+            conn.executemany(
+                "INSERT INTO moz_places(id, url, title, rev_host) VALUES (?, ?, ?, ?)",
+                ((int(i), url, None if pd.isna(t) else t, rev_host(url))
+                 for i, url, t in zip(ids[is_new], uniques[is_new], titles[is_new])),
+            )
+            conn.executemany("INSERT INTO moz_historyvisits(place_id, visit_date, visit_type) VALUES (?, ?, 1)",
+                             zip(ids[codes].tolist(), visits["visit_time"].tolist()))
+        else:
+            conn.executemany("INSERT INTO history_items(id, url, visit_count) VALUES (?, ?, 0)",
+                             zip(ids[is_new].tolist(), uniques[is_new]))
+            conn.executemany(
+                "INSERT INTO history_visits(history_item, visit_time, title) VALUES (?, ?, ?)",
+                zip(ids[codes].tolist(), visits["visit_time"].tolist(), visits["title"].where(visits["title"].notna(), None)),
+            )
+    #per-url totals the browsers keep on the url rows
+    if browser == "chrome":
+        conn.execute("""UPDATE urls SET (visit_count, last_visit_time) =
+            (SELECT count(*), max(visit_time) FROM visits WHERE visits.url = urls.id)""")
+    elif browser == "firefox":
+        conn.execute("""UPDATE moz_places SET (visit_count, last_visit_date) =
+            (SELECT count(*), max(visit_date) FROM moz_historyvisits WHERE place_id = moz_places.id)""")
+    else:
+        conn.execute("""UPDATE history_items SET visit_count =
+            (SELECT count(*) FROM history_visits WHERE history_item = history_items.id)""")
+    conn.commit()
+    if browser in ("safari", "firefox"):    #real History.db and places.sqlite files are WAL-mode
+        conn.execute("PRAGMA journal_mode=WAL")
+    conn.close()
+
+#write visits (make_visits(browser="chrome") output) as a chrome History file (urls + visits tables)
+def write_chrome_db(path, visits):
+    write_history_db(path, "chrome", [visits])
+
+#write visits (make_visits(browser="safari") output) as a safari History.db (history_items + history_visits)
+def write_safari_db(path, visits):
+    write_history_db(path, "safari", [visits])
+
+#write visits (make_visits(browser="firefox") output) as a firefox places.sqlite (moz_places + moz_historyvisits)
+def write_firefox_db(path, visits):
+    write_history_db(path, "firefox", [visits])
+
+#write a History file of [n_visits] in chunks of [chunk_visits] (each chunk covers the next slice of [days])
+def write_synthetic_history(path, browser, n_visits, days=365, n_domains=2_000, chunk_visits=500_000, seed=0):
+    if os.path.exists(path):
+        os.remove(path)
+    sizes = [min(chunk_visits, n_visits - done) for done in range(0, n_visits, chunk_visits)]
+    seconds_per_visit = days * 86_400 / max(n_visits, 1)
+
+    def chunks():
+        start = 1_700_000_000
+        for i, size in enumerate(sizes):
+            yield make_visits(size, n_domains=n_domains, days=size * seconds_per_visit / 86_400, browser=browser,
+                              seed=seed + i, search_mix=True, start=start)
+            start += int(size * seconds_per_visit)
+    write_history_db(path, browser, chunks())
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic Chrome, Safari or Firefox history database.")
+    parser.add_argument("path")
+    parser.add_argument("--browser", choices=sorted(SCHEMAS), default="chrome")
+    parser.add_argument("--visits", type=int, default=100_000, help="10k-5M is the range the app is tuned for")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--domains", type=int, default=2_000)
+    parser.add_argument("--chunk", type=int, default=500_000, help="visits generated and written at a time")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    write_synthetic_history(args.path, args.browser, args.visits, args.days, args.domains, args.chunk, args.seed)
+    print(f"wrote {args.visits:,} {args.browser} visits to {args.path} ({os.path.getsize(args.path) / 1e6:.1f} MB)")
+
+if __name__ == "__main__":
+    main()
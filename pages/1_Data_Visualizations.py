@@ -1,50 +1,31 @@
 import streamlit as st
 import pandas as pd
 import altair as alt
+from app_functions import HEATMAP_MAX_MARKS, follow_ingest
 
 st.set_page_config(page_title = "Explore your Browsing Data", layout="wide")
 
 # -------
 # HEATMAP 
 # -------
-def create_hourly_heatmap(df): #takes in raw visit data
+def create_hourly_heatmap(activity): #takes in the visits-per-date-and-hour counts built at upload (ActivityCube)
     # Check if data exists
-    
-    df = st.session_state.raw_visit_data.copy()
-    
-    if df.empty:
+    if activity.total() == 0:
         st.warning("No visit data available.")
         return
     
-    # Step 1: Extract hour and date from each visit
-    df['hour'] = df['visit_time'].dt.hour  # Gets 0-23
-    df['date'] = df['visit_time'].dt.date   # Gets just the date (no time)
-    
-    # Step 2: Count how many visits happened at each hour on each date
-    # This groups all visits by date AND hour, then counts them
-    # Example: 5 visits on 2024-01-15 at 14:00 becomes one row with count=5
-    heatmap_data = df.groupby(['date', 'hour']).size().reset_index(name='visit_count')
-    
-    # Step 3: Fill in missing hours with 0 visits
-    # If you didn't visit anything at 3am on a certain day, we still want to show 0
-    all_dates = pd.DataFrame({'date': df['date'].unique()})  # All unique dates
-    all_hours = pd.DataFrame({'hour': range(24)})             # 0 through 23
-    all_combinations = all_dates.merge(all_hours, how='cross')  # Every date × every hour
-    
-    # Merge with actual data, fill missing with 0
-    heatmap_data = all_combinations.merge(
-        heatmap_data, 
-        on=['date', 'hour'], 
-        how='left'
-    ).fillna(0)
-    
-    # Step 4: Format date as string for display
-    heatmap_data['date_str'] = pd.to_datetime(heatmap_data['date']).dt.strftime('%Y-%m-%d')
+    # Steps 1-4: one row per date (with any visits) and hour, missing hours as 0 visits
+    # The counts were made once at upload, so this never goes back to individual visits
+    # Long histories switch to one column per week or month so the chart stays under HEATMAP_MAX_MARKS rects
+    period, heatmap_data = activity.heatmap_frame(HEATMAP_MAX_MARKS)
+    period_title = {'day': 'Date', 'week': 'Week of', 'month': 'Month'}[period]
+    if period != 'day':
+        st.caption(f"Your history covers too many days to show one column per day, so each column is a {period}.")
     
     # Step 5: Create the heatmap visualization
     chart = alt.Chart(heatmap_data).mark_rect().encode(
         # X-axis: dates across the bottom
-        x=alt.X('date_str:N', title='Date', axis=alt.Axis(labelAngle=-45)),
+        x=alt.X('date_str:N', title=period_title, axis=alt.Axis(labelAngle=-45)),
         
         # Y-axis: hours down the side (midnight at top, 11pm at bottom)
         y=alt.Y('hour:O', 
@@ -63,7 +44,7 @@ def create_hourly_heatmap(df): #takes in raw visit data
         
         # Tooltip: what you see when you hover
         tooltip=[
-            alt.Tooltip('date_str:N', title='Date'),
+            alt.Tooltip('date_str:N', title=period_title),
             alt.Tooltip('hour:O', title='Hour'),
             alt.Tooltip('visit_count:Q', title='Visits')
         ]
@@ -79,32 +60,27 @@ def create_hourly_heatmap(df): #takes in raw visit data
     st.markdown("### Activity Summary")
     col1, col2, col3 = st.columns(3)
     
+    hourly = activity.hourly()  # visits per hour of day over all dates
     with col1:
-        busiest_hour = df['hour'].mode()[0] if not df.empty else 0
+        busiest_hour = int(hourly.argmax())
         st.metric("Most Active Hour", f"{busiest_hour:00d}:00")
     
     with col2:
-        total_visits = len(df)
+        total_visits = activity.total()
         st.metric("Total Visits", f"{total_visits:,}")
     
     with col3:
-        avg_per_hour = df.groupby('hour').size().mean()
+        avg_per_hour = hourly[hourly > 0].mean()  # over the hours of the day that have visits
         st.metric("Avg Visits/Hour", f"{avg_per_hour:.1f}")
 
 # ----------------------------------------------
 # FUNCTIONS: PREP FOR PIE CHART: COUNTING VISITS
 # ----------------------------------------------
 
-#aggregate # of browsing sessions by domain
-def aggregate_browsing_sessions(df):
-    session_counts = df['domain'].value_counts().reset_index() #sum all sessions w/ same domain
-    session_counts.columns = ['domain', 'total_sessions']
-    return session_counts  #return df with only domain + total visits
-
-#count domains below vs above threshold
-def compute_visit_threshold_counts(session_counts, threshold=10):
-    less_count = len(session_counts[session_counts['total_sessions'] < threshold]) #mask df and sum result
-    more_equal_count = len(session_counts[session_counts['total_sessions'] >= threshold])
+#count domains below vs above threshold (session counts per domain come from history.domain_stats())
+def compute_visit_threshold_counts(domain_stats, threshold=10):
+    less_count = domain_stats.count_below(threshold) #binary search on the sorted counts
+    more_equal_count = len(domain_stats) - less_count
 
     return pd.DataFrame(
         {
@@ -149,36 +125,35 @@ def render_visit_threshold_pie_chart(threshold_df):
 # FUNCTION: RENDER BAR CHART (domains by # visits)
 # ------------------------------------------------
 
-def render_domain_bar_chart(session_counts, top_n=20):
-    if session_counts.empty:
+def render_domain_bar_chart(domain_stats, top_n=20, group_other=False):
+    if len(domain_stats) == 0:
         st.info("No browsing data to show.")
         return
-    top_domains = session_counts.head(top_n)
+    #only [top_n] bars (+ one "Other" bar for the long tail) are sent to the browser
+    top_domains = domain_stats.top_with_other(top_n) if group_other else domain_stats.top(top_n)
     chart = (
         alt.Chart(top_domains)
         .mark_bar()
         .encode(
-            x=alt.X("domain:N", sort="-y", title="Domain",axis=alt.Axis(labelLimit=250)),
+            x=alt.X("domain:N", sort=None, title="Domain",axis=alt.Axis(labelLimit=250)), #already sorted, "Other" last
             y=alt.Y("total_sessions:Q", title="Browsing Sessions"),
             tooltip=["domain", "total_sessions"],
         )
         .properties(height=400)
     )
+    if len(top_domains) > top_n:   #grey out the "Other" bar
+        chart = chart.encode(color=alt.condition(alt.datum.domain == top_domains['domain'].iloc[-1],
+                                                 alt.value("lightgray"), alt.value("#0068c9")))
     st.altair_chart(chart, width='stretch')
 
-def render_stats_bar(df): #stats bar for bar chart
+def render_stats_bar(domain_stats): #stats bar for bar chart
     col1, col2, col3 = st.columns([0.3,0.3,0.4])
     with col1:
-        st.write(f"**Total logged browsing sessions:**  {len(df)}") #total # history entries
+        st.write(f"**Total logged browsing sessions:**  {domain_stats.n_sessions}") #total # history entries
     with col2:
-        st.write(f"**Unique domains:** {df['domain'].nunique()}")
-    with col3:   #split into cases based on the table
-        if 'session_start' in df and 'session_end' in df:
-            st.write(f"**Timeframe:** {df['session_start'].min()} to {df['session_end'].max()}")
-        elif 'visit_time' in df:
-            st.write(f"**Timeframe:** {df['visit_time'].min()} to {df['visit_time'].max()}")
-        else:
-            return
+        st.write(f"**Unique domains:** {len(domain_stats)}")
+    with col3:
+        st.write(f"**Timeframe:** {domain_stats.first_start} to {domain_stats.last_end}")
     return
 # -------------------------------------------------------------
 # FUNCTION: RENDER HEAT MAP (Most common browsing times per day)
@@ -192,22 +167,17 @@ def render_data():
 
     df = pd.DataFrame()  # initialize empty df
 
-    if 'browsing_session_counts' in st.session_state:
-        aggregate_sessions_data = st.session_state.browsing_session_counts   #get data from cache
+    if 'domain_stats' in st.session_state:
+        domain_stats = st.session_state.domain_stats   #get data from cache
     else:
-        st.error("browsing_session_counts is not in the session state.")
+        st.error("domain_stats is not in the session state.")
+    aggregate_sessions_data = domain_stats.table() #already sorted, most sessions first
     
-    #DOWNLOAD TOP DOMAINS (CSV)
-    aggregate_sessions_data.sort_values(['total_sessions'])
-    top_1000_domains = aggregate_sessions_data.head(1000) #top 1000 most visited domains
-    csv_data = top_1000_domains.to_csv()
 
     # ---------------------
     # RENDER BAR CHART
     # ---------------------
 
-    aggregate_sessions_data.sort_values('total_sessions')
-
     st.markdown("#### Top 3 Domains")
     cols = st.columns([1,1,1])
     for i, col in enumerate(cols):
@@ -224,11 +194,11 @@ def render_data():
     with col2: 
         st.download_button(     #download button (csv)
             label="Download top 1000 domains (CSV)",
-            data=csv_data,
+            data=lambda: domain_stats.top(1000).to_csv(),    #top 1000 most visited domains, built only when clicked
             file_name=f"top_1000_domains.csv",
         )
 
-    render_stats_bar(raw_session_data)
+    render_stats_bar(domain_stats)
 
     if len(aggregate_sessions_data) == 0:
         st.warning("There are no sessions in your browsing history to display.")
@@ -237,8 +207,9 @@ def render_data():
     #BAR CHART SLIDER (for # sites to display)
     top_n = 50
     top_n = st.slider("Number of domains", 5, 100, top_n, 5)
+    group_other = st.checkbox("Show all other domains as one \"Other\" bar", value=False)
 
-    render_domain_bar_chart(aggregate_sessions_data, top_n)
+    render_domain_bar_chart(domain_stats, top_n, group_other)
 
     # ------------------
     # RENDER PIE CHART
@@ -250,7 +221,7 @@ def render_data():
     threshold = 10 #domain visit threshold input adjuster
     with col1:
         threshold = st.number_input("Adjust visit threshold", 1, 1000, 10, 1, width=200)
-        threshold_df = compute_visit_threshold_counts(aggregate_sessions_data, threshold) #just stores below count, above count
+        threshold_df = compute_visit_threshold_counts(domain_stats, threshold) #just stores below count, above count
         render_visit_threshold_pie_chart(threshold_df) #render with threshold
 
     #RENDER TOTAL PERCENT (BELOW AND ABOVE THRESHOLD)
@@ -267,7 +238,7 @@ def render_data():
             ### You visited :blue[{percent_below}%] of the sites in your browser history less than :blue[{threshold}] times.
             """)
         
-        domains_below = aggregate_sessions_data[aggregate_sessions_data['total_sessions'] < threshold] #mask df with only rows < threshold
+        domains_below = domain_stats.below(threshold) #tail of the sorted table: only rows < threshold
 
         #DISPLAY LIST (less-visited sites)
         if len(domains_below) > 0:
@@ -280,27 +251,22 @@ def render_data():
     #ADD EXPLANATION BELOW
 
     #RENDER HEATMAP
-    #st.markdown("### Browsing Activity Heatmap")
-    #create_hourly_heatmap()
+    st.markdown("### Browsing Activity Heatmap")
+    create_hourly_heatmap(history.activity)
     
 
 st.markdown("## **Visualize your Browsing Data**")
 
-if 'uploaded_df' not in st.session_state:
+follow_ingest()     #a large upload still being read: show what's there so far
+
+if 'history' not in st.session_state:
     st.info("Upload your History file to view this page.")
 else:
-    if 'raw_session_data' not in st.session_state:
-        st.error("raw session data not in cache!")
-    elif 'raw_visit_data' not in st.session_state:
-        st.error("raw visit data not in cache!")
-    else: 
-        #get data from cache
-        uploaded_df = st.session_state.uploaded_df
-        raw_session_data = st.session_state.raw_session_data
-        raw_visit_data = st.session_state.raw_visit_data
-
-        #aggregate the data and save to cache
-        st.session_state.browsing_session_counts = aggregate_browsing_sessions(raw_session_data)
-
-        #render visualizations
-        render_data()
\ No newline at end of file
+    #nothing here materializes visits or sessions: the heatmap uses history.activity, the charts history.domain_stats()
+    history = st.session_state.history
+
+    #aggregate the data and save to cache (memoized per dataset, so sliders don't recount sessions)
+    st.session_state.domain_stats = history.domain_stats()
+
+    #render visualizations
+    render_data()
\ No newline at end of file
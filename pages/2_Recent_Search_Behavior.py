@@ -3,7 +3,9 @@ import pandas as pd
 import altair as alt
 from wordcloud import WordCloud
 import matplotlib.pyplot as plt
+import io
 from pathlib import Path
+from app_functions import follow_ingest, frequency_digest
 
 st.set_page_config(page_title = "Understand your Recent Search Behavior", layout="wide")
 
@@ -11,99 +13,87 @@ st.set_page_config(page_title = "Understand your Recent Search Behavior", layout
 # VISUALIZE SEARCH RESULTS
 # ------------------------
 
-#make wordcloud from queries df
-def render_wordcloud(raw_data):
-    raw_data = raw_data.sort_values(by='visit_time').reset_index(drop=True)
-    query_indices = raw_data[raw_data['title'].str.contains('Google Search', na=False)].index #mask with google search
+#word cloud image for a set of word frequencies, cached by their digest (the dict itself isn't hashed)
+@st.cache_data(max_entries=16, show_spinner=False)
+def render_wordcloud_png(digest, _frequencies):
+    wordcloud = WordCloud(
+        width=1000,
+        height=500,
+        background_color='white',
+        colormap='Blues_r',  # Example: use a specific color map
+        max_words=200,
+        font_path = Path(__file__).parent / "Source_Sans_3" / "SourceSans3-Regular.ttf",
+        #"/Users/propadiene/cloned-repos/browsing-history-app/pages/Source_Sans_3/SourceSans3-Regular.ttf",
+        scale=2, # Increase scale for higher resolution on save
+        random_state=16     #set random state for reproducible results
+    ).generate_from_frequencies(_frequencies)
+
+    #draw like st.pyplot does, once, and keep the png
+    fig, ax = plt.subplots()
+    ax.imshow(wordcloud, interpolation='bilinear')
+    ax.axis("off")
+    png = io.BytesIO()
+    fig.savefig(png, format="png", bbox_inches="tight", dpi=200)
+    plt.close(fig)
+    return png.getvalue()
 
-    if len(query_indices) == 0:
-        st.info("No google searches were found in your history.")
+#make wordcloud from the search word counts kept with the history (no visit rows are scanned here)
+def render_wordcloud(history):
+    if history.n_searches == 0:
+        st.info("No searches were found in your history.")
         return
     
     st.markdown("### Most Common Search Words")
     st.markdown("This word cloud aggregates all the words from your search queries (anything you type into your search bar).")
-    #wordlist = []
 
-    google_searches = raw_data[
-        raw_data['title'].str.contains('Google Search', na=False, case=False)
-    ].copy()
-
-    if google_searches.empty:
-        st.info("No searches were found in your history.")
-        return
-    
-    #replace all Google Search ending
-    google_searches['query'] = google_searches['title'].str.replace('- Google Search', '', regex=False)
-    all_words = ' '.join(google_searches['query'].dropna().astype(str))
-    
-    if not all_words.strip():
+    frequencies = history.word_frequencies()   #search words -> counts, stopwords removed
+    if not frequencies:
         st.info("No valid words in search queries")
         return
 
     with st.spinner('Generating word cloud...'):
-        wordcloud = WordCloud(
-            width=1000,
-            height=500,
-            background_color='white',
-            colormap='Blues_r',  # Example: use a specific color map
-            max_words=200,
-            font_path = Path(__file__).parent / "Source_Sans_3" / "SourceSans3-Regular.ttf",
-            #"/Users/propadiene/cloned-repos/browsing-history-app/pages/Source_Sans_3/SourceSans3-Regular.ttf",
-            scale=2, # Increase scale for higher resolution on save
-            random_state=16     #set random state for reproducible results
-        ).generate(all_words)
-
-    if wordcloud is None:
-        st.info("Could not generate word cloud")
-        return
+        png = render_wordcloud_png(frequency_digest(frequencies), frequencies)
 
     #display wordcloud
-    fig, ax = plt.subplots()
-    ax.imshow(wordcloud, interpolation='bilinear')
-    ax.axis("off")
-    st.pyplot(fig)
-    plt.close(fig)
+    st.image(png, width='stretch')
 
     return
 
-#shows 10 searches after a query
-def render_query_table(raw_data, limit=30):
-    raw_data = raw_data.sort_values(by='visit_time').reset_index(drop=True)
-    query_indices = raw_data[raw_data['title'].str.contains('Google Search', na=False)].index #mask with google search
+#shows 10 searches after a query, for one page of searches (most recent first)
+def render_query_table(history, limit=30):
+    timeline = history.search_timeline()    #visits in time order + positions of the searches, built once per dataset
 
-    if len(query_indices) == 0:
-        st.info("No google searches were found in your history.")
+    if len(timeline) == 0:
+        st.info("No searches were found in your history.")
         return
     st.markdown("### Recent Search Behavior")
-    st.markdown(f"Below you can view {min(limit, len(query_indices))} of your most recent searches. Each one opens a dropdown, revealing the next 10 sites that you visited after entering the search.")
-
-    #only go up to the last [limit] searches
-    recent_searches = query_indices[::-1][:limit]
-
-    for search_index in recent_searches:
-        row = raw_data.iloc[search_index] #look up query in full data table
-        if pd.isna(row['title']) or not isinstance(row['title'], str):
-            search_title = "Untitled Search"
-        else:
-            search_title = row['title'].replace('- Google Search', '')
-        search_results = raw_data.iloc[search_index+1 : search_index+11][['visit_time', 'domain', 'url', 'title']]
-        if search_index + 1 >= len(raw_data):
+
+    #page back through all searches; each page only reads its own [limit] searches
+    n_pages = -(-len(timeline) // limit)
+    page = 1
+    if n_pages > 1:
+        page = st.number_input(f"Page (1 = most recent, {n_pages:,} pages of {limit})", 1, n_pages, 1, 1, width=300)
+    searches = timeline.page(page - 1, limit)
+    st.markdown(f"Below you can view {len(searches)} of your {'most recent ' if page == 1 else ''}searches. Each one opens a dropdown, revealing the next 10 sites that you visited after entering the search.")
+
+    for search_index in searches:
+        query, engine, visit_time = timeline.search(search_index) #query + engine parsed from the search url at upload
+        search_title = f"{query} ({engine})"
+        search_results = timeline.following(search_index, 10)[['visit_time', 'domain', 'url', 'title']]
+        if search_results.empty:
             st.info("No results after this search")
             continue
         
-        with st.expander(f"{search_title} | {row['visit_time']}"): #display in streamlit
+        with st.expander(f"{search_title} | {visit_time}"): #display in streamlit
             st.dataframe(search_results, hide_index=True, width='stretch')
-    return query_indices    #return the df of queries
+    return timeline    #return the searches index
 
 st.markdown("## Explore your Search Behavior")
 
-if 'uploaded_df' not in st.session_state:
+follow_ingest()     #a large upload still being read: show what's there so far
+
+if 'history' not in st.session_state:
     st.info("Upload your History file to view this page.")
 else:
-    if 'raw_session_data' not in st.session_state:
-        st.error("raw session data not in cache!")
-    elif 'raw_visit_data' not in st.session_state:
-        st.error("raw visit data not in cache!")
-    else:
-        render_wordcloud(st.session_state.raw_visit_data)
-        render_query_table(st.session_state.raw_visit_data) #display behavior based on visits, not sessions
\ No newline at end of file
+    render_wordcloud(st.session_state.history)
+    render_query_table(st.session_state.history) #display behavior based on visits, not sessions
@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
 import altair as alt
+from app_functions import export_sessions_parquet, export_visits_parquet, follow_ingest
 
 st.set_page_config(page_title = "View your Raw Browsing Data", layout="wide")
 
@@ -8,60 +9,77 @@ st.set_page_config(page_title = "View your Raw Browsing Data", layout="wide")
 # FUNCTIONS: RENDER RAW TABLE AND STATS BAR
 # --------------------------------
 
-#raw table of results (all visits/browsing sessions for all links)
-def render_raw_table(df):
-    if not df.empty:
-        columns_order = ["domain", "title", "url", "session_length", "session_start", "session_end", "visit_count"]
-        display_cols = [c for c in columns_order if c in df.columns]
-
-        if display_cols:
-            st.dataframe(df[display_cols], width='stretch', hide_index=True)
-        else:
-            st.dataframe(df, width='stretch', hide_index=True)
-    else:
+ROWS_PER_PAGE = 50
+
+#one page of a raw table (all visits/browsing sessions for all links), sorted and filtered on the server
+def render_raw_table(pager, columns, sort_default, key):
+    if not len(pager):
         st.info("No browsing data to show.")
+        return
+    sortable = [c for c in columns if c in pager.keys]
+    col1, col2, col3, col4 = st.columns([0.25, 0.15, 0.25, 0.35])
+    with col1:
+        sort_by = st.selectbox("Sort by", sortable, index=sortable.index(sort_default), key=f"{key}_sort")
+    with col2:
+        st.write("")    #line the checkbox up with the inputs
+        descending = st.checkbox("Descending", value=True, key=f"{key}_descending")
+    with col3:
+        domain = st.text_input("Domain", placeholder="e.g. youtube", key=f"{key}_domain")
+    with col4:
+        search = st.text_input("Search titles and urls", placeholder="e.g. pyth docs", key=f"{key}_search",
+                               help="Shows rows where every word you type starts a word of the title or url.")
+
+    rows = pager.rows(sort_by, descending, domain, search)
+    if not len(rows):
+        st.info("No rows match these filters.")
+        return
+    pages = -(-len(rows) // ROWS_PER_PAGE)
+    #the page number starts over whenever the sort or filters change
+    page = st.number_input(f"Page (of {pages:,})", min_value=1, max_value=pages, value=1,
+                           key=f"{key}_page_{sort_by}_{descending}_{domain}_{search}")
+    first = (page - 1) * ROWS_PER_PAGE
+    shown = rows[first:first + ROWS_PER_PAGE]
+    st.dataframe(pager.page(shown)[columns], width='stretch', hide_index=True)
+    st.caption(f"Rows {first + 1:,}\u2013{first + len(shown):,} of {len(rows):,}")
 
 #render stats bar for a raw table
-def render_stats_bar(df):
+def render_stats_bar(pager, label):
+    summary = pager.summary()
     col1, col2, col3 = st.columns([0.3,0.3,0.4])
     with col1:
-        st.write(f"**Total logged browsing sessions:**  {len(df)}") #total # history entries
+        st.write(f"**{label}:**  {summary['rows']}") #total # history entries
     with col2:
-        if 'domain' in df.columns:
-            st.write(f"**Unique domains:** {df['domain'].nunique()}")
-    with col3:   #split into cases based on the table
-        if 'session_start' in df and 'session_end' in df:
-            st.write(f"**Timeframe:** {df['session_start'].min()} to {df['session_end'].max()}")
-        elif 'visit_time' in df:
-            st.write(f"**Timeframe:** {df['visit_time'].min()} to {df['visit_time'].max()}")
-        else:
-            return
+        st.write(f"**Unique domains:** {summary['domains']}")
+    with col3:
+        if summary['start'] is not None:
+            st.write(f"**Timeframe:** {summary['start']} to {summary['end']}")
     return
 
 def render_raw_data():
-    if 'raw_session_data' not in st.session_state:
-        st.error("raw session data not in cache!")
-        return
-    if 'raw_visit_data' not in st.session_state:
-        st.error("raw visit data not in cache!")
-        return
-    
-    raw_visit_data = st.session_state.raw_visit_data    #get data from cache
-    raw_session_data = st.session_state.raw_session_data
-    uploaded_df = st.session_state.uploaded_df
+    history = st.session_state.history    #get data from cache
+    visit_table = history.visit_table()   #pages are materialized from the compact store as they are shown
+    session_table = history.session_table()
+    browser = st.session_state.get('browser', 'unknown')
 
     #VIEW FILTERED BROWSING DATA
     st.markdown("View a table of all your browsing sessions below! All keyword filters have been applied.")
 
     st.markdown("### Raw Data (Browsing Sessions)")
 
-    render_stats_bar(raw_session_data)
-    st.info("""Each row represents a browsing session of 30 minutes or less. You can sort columns by clicking headers.""")
+    render_stats_bar(session_table, "Total logged browsing sessions")
+    st.info("""Each row represents a browsing session of 30 minutes or less. Use the controls above the table to sort and filter all of your sessions.""")
     
     #ADD INFO: the visit_count on the right is the # of visits within the same session.
 
     #render raw table
-    render_raw_table(raw_session_data)
+    render_raw_table(session_table, ["domain", "title", "url", "session_length", "session_start", "session_end", "visit_count"],
+                     "session_start", "sessions")
+    st.download_button(     #file is only built when the button is clicked
+        label="Download sessions (Parquet)",
+        data=lambda: export_sessions_parquet(history),
+        file_name="browsing_sessions.parquet",
+        mime="application/vnd.apache.parquet",
+    )
 
     with st.expander("Details for how we tracked the browsing sessions", expanded=False):
         st.markdown("""
@@ -77,18 +95,23 @@ def render_raw_data():
         """)
 
     st.markdown("### Raw Data (Clicks)")
-    render_stats_bar(raw_visit_data)
-    st.info("""Each row represents a click to a domain. You can sort columns by clicking headers.""")
-    columns_order = ["domain", "title", "url", "visit_time"]
-    display_cols = [c for c in columns_order if c in raw_visit_data.columns]
-    if display_cols:
-        st.dataframe(raw_visit_data[display_cols], width='stretch', hide_index=True)
-    else:
-        st.dataframe(raw_visit_data, width='stretch', hide_index=True)
+    render_stats_bar(visit_table, "Total logged clicks")
+    st.info("""Each row represents a click to a domain. Use the controls above the table to sort and filter all of your clicks.""")
+    columns = ["domain", "title", "url", "visit_time"] + (["profile"] if "profile" in visit_table.keys else [])
+    render_raw_table(visit_table, columns, "visit_time", "visits")
+    st.download_button(     #file is only built when the button is clicked
+        label="Download clicks (Parquet)",
+        data=lambda: export_visits_parquet(history, browser),
+        file_name="browsing_history.parquet",
+        mime="application/vnd.apache.parquet",
+        help="Upload this file on the Home page to see your results again without processing your History file.",
+    )
 
 st.markdown("## **View your Raw Data**")
 
-if 'uploaded_df' not in st.session_state:
+follow_ingest()     #a large upload still being read: show what's there so far
+
+if 'history' not in st.session_state:
     st.info("Upload your History file to view this page.")
 else:
     render_raw_data()
\ No newline at end of file
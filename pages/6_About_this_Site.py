@@ -7,7 +7,7 @@ st.markdown("## About this Site")
 st.markdown("### Description")
 st.markdown("""
 
-This is an app for you to view and analyze your browsing history. It currently works for Chrome and Safari.
+This is an app for you to view and analyze your browsing history. It currently works for Chrome, Safari and Firefox.
 
 This site was greatly inspired by [the Cookies Project](https://cookiesproject.streamlit.app/) made by Jessica, Nina, Crystal, and Dianna from Wellesley Cred Lab. Go check it out!
 
@@ -24,7 +24,7 @@ This site was greatly inspired by [the Cookies Project](https://cookiesproject.s
 The goal is to visualize your browsing patterns and understand what kind of personal data your browser contains.
 
 ### Privacy
-We do not store any of your data! Your file is stored in your current session state (the current session's memory), and will disappear when your session ends -- unless you choose to share it with us using the "share data" page.
+We do not keep any of your data after you leave! Your file is stored in your current session state (the current session's memory) and in a server-side cache shared by identical uploads, and both are cleared when your session ends (or after an hour without use) -- unless you choose to share it with us using the "share data" page.
 
 ### Authors
 Made by the Wellesley Cred Lab. Led by Aileen Liang, advised by Prof. Eni Mustafaraj.